@@ -0,0 +1,60 @@
+# checks that evaluate_formula_batch (and TrackKeyframes.frame_value, which exports use for E:/L:/G: events) give the
+# same values as evaluate_formula called frame by frame. run it from the repository root:
+#   python __dev__/check_batch_formulas.py [--mobs N] [--events M] [--seed S] [--fps F]
+import argparse
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+from generate_scene import generate_scene
+from src.timeline_model import timeline_from_lists
+
+# formulas that the generated scenes don't have: functions that don't broadcast, constants, other easings...
+EXTRA_ROWS = [
+    [[0, 1, "linear", "E: array([min(t, 0.5), max(t, 0.2), 0])"], [1, 1, "smooth", "L: [2, -1, 0]"]],
+    [[0, 1, "smooth", "E: 3"], [1, 1, "linear", "E: round(4*t)"], [2, 1, "there_and_back", "L: -PI"]],
+    [[0, 1, "linear", "G: 2"], [1, 1, "smooth", "E: norm(array([t, 1, 0]))"], [2, 1, "linear", "G: 0.5"]],
+    [[0, 1, "linear", "L: 0.5"], [1, 1, "linear", "G: 1"], [2, 1, "there_and_back", "E: t*norm(t)"]],
+    [],
+]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the batch evaluation of formulas with the frame by frame one.")
+    parser.add_argument("--mobs", type=int, default=10)
+    parser.add_argument("--events", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=30)
+    args = parser.parse_args(argv)
+
+    from src.pasos import PASOS, TrackKeyframes, evaluate_formula, evaluate_formula_batch
+    scene_dict = generate_scene(args.mobs, args.events, seed=args.seed)
+    timeline = timeline_from_lists(scene_dict["timeline"] + EXTRA_ROWS)
+    scene = PASOS(False)
+    scene.edtv = {"time": 0}
+    scene.timeline = timeline
+    scene.update_visible_mobs()
+
+    checked, mismatches = 0, 0
+    for row_idx, event_list in enumerate(timeline):
+        track = TrackKeyframes(row_idx, event_list, scene.nv)
+        for idx, p_event in enumerate(event_list):
+            if not track.batchable[idx]:
+                continue
+            init_value = track.init_value(idx)
+            frames = range(round(p_event.start * args.fps), round(p_event.end * args.fps) + 1)
+            alphas = [track.rate_funcs[idx](min(max(n / args.fps - p_event.start, 0) / p_event.duration, 1)) for n in frames]
+            expected = [evaluate_formula(p_event.formula, init_value, alpha, scene.nv) for alpha in alphas]
+            batch = evaluate_formula_batch(p_event.formula, init_value, alphas, scene.nv)
+            frame_values = [track.frame_value(idx, init_value, n / args.fps, args.fps) for n in frames]
+            for name, values in (("evaluate_formula_batch", batch), ("frame_value", frame_values)):
+                checked += 1
+                if not np.allclose(np.asarray(values, dtype=float), np.asarray(expected, dtype=float), equal_nan=True):
+                    mismatches += 1
+                    print(f"row {row_idx} event {idx} ({p_event.formula}): {name} differs")
+    print(f"{checked} checks, {mismatches} mismatches")
+    return int(mismatches > 0)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# exports the same generated scene with one process and with several (chunks joined by headless.concat_movies) and
+# checks that both movies have the same number of frames, the same duration and the same frames. the chunks are encoded
+# separately, so their frames aren't bit for bit the ones of the serial movie: a frame differs when more than --tolerance
+# of its pixels differ by more than PIXEL_THRESHOLD in some channel. encoding noise stays far below the default (a few
+# pixels at the edges), while a mob drawn one frame late changes hundreds. run it from the repository root:
+#   python __dev__/check_parallel_export.py [--mobs N] [--events M] [--workers W] [--fps F] [--tolerance T] [--keep DIRECTORY]
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate_scene import generate_scene
+from src.timeline_model import timeline_from_lists
+
+PIXEL_THRESHOLD = 64 # out of 255
+
+# number of frames and duration (seconds) of a movie, and whether the timestamps of its frames always increase
+def get_movie_info(movie_path: str) -> tuple:
+    import av
+    with av.open(movie_path) as movie_input:
+        stream = movie_input.streams.video[0]
+        frame_times = [frame.time for frame in movie_input.decode(stream)]
+        duration = movie_input.duration / av.time_base if movie_input.duration != None else None
+        frame_duration = 1 / float(stream.average_rate)
+    increasing = all(a < b for a, b in zip(frame_times, frame_times[1:]))
+    return len(frame_times), duration, frame_duration, increasing
+
+def iterate_frames(movie_path: str):
+    import av
+    with av.open(movie_path) as movie_input:
+        for frame in movie_input.decode(movie_input.streams.video[0]):
+            yield frame.to_ndarray(format="rgb24")
+
+# frame number and fraction of different pixels of the frames that differ more than the tolerance
+def compare_frames(serial_path: str, parallel_path: str, tolerance: float) -> list:
+    import numpy as np
+    mismatches = []
+    for frame_number, (serial_frame, parallel_frame) in enumerate(zip(iterate_frames(serial_path), iterate_frames(parallel_path))):
+        difference = (np.abs(serial_frame.astype(np.int16) - parallel_frame.astype(np.int16)).max(axis=2) > PIXEL_THRESHOLD).mean()
+        if difference > tolerance:
+            mismatches.append((frame_number, difference))
+    return mismatches
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare a parallel export with a serial one.")
+    parser.add_argument("--mobs", type=int, default=5)
+    parser.add_argument("--events", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--tolerance", type=float, default=0.0002)
+    parser.add_argument("--keep", help="directory where the movies are kept, by default they're deleted")
+    args = parser.parse_args(argv)
+
+    from manim import config
+    from src.headless import render_scene, render_scene_parallel
+    config.frame_rate = args.fps
+    config.pixel_width, config.pixel_height = 640, 360
+
+    # short scene with an odd number of frames, so the chunks have different lengths
+    scene_dict = generate_scene(args.mobs, args.events, duration=3.05)
+    scene_dict["timeline"] = timeline_from_lists(scene_dict["timeline"])
+    directory = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix="pasos_check_"))
+    directory.mkdir(parents=True, exist_ok=True)
+    serial_path, parallel_path = str(directory / "serial.mp4"), str(directory / "parallel.mp4")
+    render_scene(scene_dict, serial_path)
+    render_scene_parallel(scene_dict, parallel_path, args.workers)
+
+    serial, parallel = get_movie_info(serial_path), get_movie_info(parallel_path)
+    failed = False
+    print(f"{'':<10}{'frames':>8}{'duration':>10}")
+    for name, (n_of_frames, duration, _, increasing) in (("serial", serial), ("parallel", parallel)):
+        print(f"{name:<10}{n_of_frames:>8}{duration:>10.4f}")
+        if not increasing:
+            print(f"the frames of the {name} movie aren't in order")
+            failed = True
+    if serial[0] != parallel[0]:
+        print("the number of frames differs")
+        failed = True
+    if abs(serial[1] - parallel[1]) > serial[2] / 2: # the muxer may round the last frame differently
+        print("the duration differs")
+        failed = True
+    mismatches = compare_frames(serial_path, parallel_path, args.tolerance)
+    for frame_number, difference in mismatches:
+        print(f"frame {frame_number} differs ({100 * difference:.3f}% of the pixels)")
+    if mismatches:
+        failed = True
+    if not args.keep:
+        for path in (serial_path, parallel_path):
+            Path(path).unlink(missing_ok=True)
+        directory.rmdir()
+    return int(failed)
+
+if __name__ == "__main__":
+    sys.exit(main())
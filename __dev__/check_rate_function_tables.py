@@ -0,0 +1,33 @@
+# checks the error of the tabulated rate functions (rate_functions.TabulatedRateFunction) against the exact easings
+# and against the documented bound h^2/8 * max|f''|, with f'' estimated by finite differences
+# run it from the repository root: python __dev__/check_rate_function_tables.py
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from src.rate_functions import manim_rate_functions, get_rate_function, TABLE_RESOLUTION
+
+SAMPLES = 100003 # not a multiple of the table resolution, so most samples fall between two table points
+KINKED = {"there_and_back", "there_and_back_with_pause", "wiggle", "lingering", "ease_in_bounce", "ease_out_bounce", "ease_in_out_bounce"}
+
+if __name__ == "__main__":
+    ts = np.linspace(0, 1, SAMPLES)
+    h = 1 / TABLE_RESOLUTION
+    failed = []
+    print(f"{'rate function':<28}{'max error':>12}{'bound':>12}")
+    for name in dict.fromkeys(manim_rate_functions):
+        exact = np.array([get_rate_function(name)(t) for t in ts])
+        table = get_rate_function(name, tabulated=True)(ts)
+        error = np.max(np.abs(exact - table))
+        if name in KINKED:
+            bound = h / 2 * np.max(np.abs(np.diff(exact))) / (ts[1] - ts[0])
+        else:
+            bound = h**2 / 8 * np.max(np.abs(np.diff(exact, 2))) / (ts[1] - ts[0])**2
+        bound = bound * 1.05 + 1e-12 # room for the finite difference estimates
+        print(f"{name:<28}{error:>12.2e}{bound:>12.2e}")
+        if error > bound:
+            failed.append(name)
+    if failed:
+        sys.exit(f"error above the bound for: {', '.join(failed)}")
+    print("all tabulated rate functions are within their error bound")
@@ -0,0 +1,90 @@
+# generates synthetic PASOS scenes to measure how the engine scales with the number of mobjects and events
+# run it from the repository root:
+#   python __dev__/generate_scene.py output.json [--mobs N] [--events M] [--mix L=2,G=1,E=1,C=1,W=1,T=2,S=1]
+# the output can be .json or .pasosb
+import argparse
+import math
+import random
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.scene_file import write_scene_file
+from src.timeline_model import timeline_from_lists
+
+DEFAULT_MIX = "L=2,G=1,E=1,C=1,W=1,T=2,S=1"
+# formula types that make sense on every track (position, angle, scale, opacity, sprite).
+# G divides by the initial value, so it's only used on scale, where it's never 0
+TRACK_FORMULA_TYPES = ["LE", "LE", "LGE", "LE", "CWTS"]
+SPRITES = [
+    "Square(fill_opacity=0.1)",
+    "Circle(color='#58C4DD', fill_opacity=0.1)",
+    "RegularPolygon({n}, fill_opacity=0.1, color='#0080ff')",
+    "Star({n}, color='#FFFF00')",
+    "VGroup(Square(), Circle(radius=0.5)).arrange(RIGHT)", # S: transforms its submobjects
+]
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(","):
+        formula_type, weight = item.split("=")
+        mix[formula_type.strip().upper()] = float(weight)
+    return mix
+
+def create_formula(formula_type: str, track: int, rng: random.Random) -> str:
+    n = rng.randint(3, 8)
+    if track == 4:
+        return f"{formula_type}: " + rng.choice(SPRITES).format(n=n)
+    if track == 0: # position
+        x, y = rng.uniform(-6, 6), rng.uniform(-3, 3)
+        if formula_type == "E":
+            return f"E: array([{x:.2f} * cos(2*PI*t), {y:.2f} * sin(2*PI*t), 0])"
+        return f"L: [{x:.2f}, {y:.2f}, 0]"
+    if track == 1: # angle
+        angle = rng.uniform(-math.pi, math.pi)
+        return f"E: {angle:.3f} * sin(PI*t)" if formula_type == "E" else f"L: {angle:.3f}"
+    if track == 2: # scale
+        if formula_type == "E":
+            return f"E: 1 + {rng.uniform(0.1, 0.5):.2f} * sin(PI*t)"
+        return f"{formula_type}: {rng.uniform(0.5, 2):.2f}"
+    opacity = rng.uniform(0.3, 1) # opacity
+    return f"E: {opacity:.2f} + {1 - opacity:.2f} * cos(PI*t)" if formula_type == "E" else f"L: {opacity:.2f}"
+
+# scene dict in the json format (lists, not PEvents). every track has `events_per_track` events (or none if the mix
+# has no formula type for it), spread over the duration without overlapping
+def generate_scene(n_of_mobs: int, events_per_track: int, mix: dict = None, duration: float = 10, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    mix = mix or parse_mix(DEFAULT_MIX)
+    timeline = []
+    for _ in range(n_of_mobs):
+        for track in range(5):
+            types = [t for t in TRACK_FORMULA_TYPES[track] if mix.get(t, 0) > 0]
+            row = []
+            if types:
+                slot = duration / events_per_track
+                for k in range(events_per_track):
+                    start = k * slot + rng.uniform(0, 0.2) * slot
+                    length = rng.uniform(0.5, 0.75) * slot
+                    formula_type = rng.choices(types, weights=[mix[t] for t in types])[0]
+                    # sprites start with C: so there is something to transform
+                    if track == 4 and k == 0 and "C" in types:
+                        formula_type = "C"
+                    row.append([round(start, 4), round(length, 4), "smooth", create_formula(formula_type, track, rng)])
+            timeline.append(row)
+    return {"duration": duration, "timeline": timeline, "invisible_objects": []}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic PASOS scene.")
+    parser.add_argument("output", help="scene file (.json or .pasosb)")
+    parser.add_argument("--mobs", type=int, default=10, help="number of mobjects")
+    parser.add_argument("--events", type=int, default=4, help="events per track")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="weights of the formula types, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    scene_dict = generate_scene(args.mobs, args.events, args.mix, args.duration, args.seed)
+    scene_dict["timeline"] = timeline_from_lists(scene_dict["timeline"])
+    write_scene_file(args.output, scene_dict)
+
+if __name__ == "__main__":
+    main()
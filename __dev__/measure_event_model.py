@@ -0,0 +1,46 @@
+# compares the memory and iteration speed of PEvents against the old [start, duration, easing, formula] lists
+# run it from the repository root: python __dev__/measure_event_model.py [number of events]
+import random
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.timeline_model import PEvent
+
+N_OF_EVENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+EVENTS_PER_ROW = 50
+NUMBER = 20
+
+def create_rows(create_event) -> list:
+    random.seed(0)
+    rows = []
+    for _ in range(N_OF_EVENTS // EVENTS_PER_ROW):
+        row, time = [], 0
+        for _ in range(EVENTS_PER_ROW):
+            start, duration = time + random.random(), random.random() + 0.01
+            row.append(create_event(start, duration, "linear", "L: 1")) # strings are shared, as they are after json.load
+            time = start + duration
+        rows.append(row)
+    return rows
+
+def measure_memory(create_event) -> int:
+    tracemalloc.start()
+    rows = create_rows(create_event)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+if __name__ == "__main__":
+    list_rows = create_rows(lambda *e: list(e))
+    pevent_rows = create_rows(PEvent)
+    # the loops TrackKeyframes and the timeline canvas run over every event of a row
+    t_list = timeit.timeit(lambda: [[e[0] + e[1] for e in row] for row in list_rows], number=NUMBER) / NUMBER
+    t_pevent = timeit.timeit(lambda: [[e.start + e.duration for e in row] for row in pevent_rows], number=NUMBER) / NUMBER
+    m_list = measure_memory(lambda *e: list(e))
+    m_pevent = measure_memory(PEvent)
+    print(f"{N_OF_EVENTS} events")
+    print(f"{'':<10}{'bytes/event':>14}{'ends of all rows (ms)':>24}")
+    print(f"{'lists':<10}{m_list / N_OF_EVENTS:>14.1f}{t_list * 1e3:>24.2f}")
+    print(f"{'PEvent':<10}{m_pevent / N_OF_EVENTS:>14.1f}{t_pevent * 1e3:>24.2f}")
@@ -0,0 +1,92 @@
+# compares PASOS.update_mobs with and without the point arena (see src/point_arena.py) on a particle system: thousands of
+# Dots that move and spin at every frame. run it from the repository root:
+#   python __dev__/measure_point_arena.py [--dots N] [--frames F] [--fade]
+# with --fade the dots also fade out, which calls become() on every dot at every frame (their number of points stays the same)
+# "transforms" is the time profiled for applying position/angle/scale (rebuild_mob or rebuild_mobs_in_arena),
+# "update_mobs" is the whole frame without profiling. the points of both scenes are compared at every frame
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.timeline_model import timeline_from_lists
+
+N_OF_FORMULAS = 64 # formulas are shared by many dots (with different starts) so they stay in the formula cache
+
+def generate_particles(n_of_dots: int, duration: float, fade: bool, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    timeline = []
+    for _ in range(n_of_dots):
+        k = rng.randrange(N_OF_FORMULAS)
+        radius = 0.5 + 3 * k / N_OF_FORMULAS
+        start = rng.uniform(0, 0.1) # the sprite is created before any dot starts moving
+        position = [[start + 0.1, duration, "linear", f"E: array([{radius:.2f} * cos(2*PI*t + {k}), {radius / 2:.2f} * sin(2*PI*t + {k}), 0])"]]
+        angle = [[start + 0.1, duration, "linear", f"E: {k} * PI * t"]]
+        sprite = [[0, 0.05, "linear", "C: Dot(radius=0.04)"]]
+        opacity = [[start + 0.1, duration, "linear", "L: 0.1"]] if fade else []
+        timeline += [position, angle, [], opacity, sprite]
+    return {"duration": duration + 0.2, "timeline": timeline, "invisible_objects": []}
+
+def create_scene(scene_dict: dict, use_point_arena: bool):
+    from src.pasos import PASOS
+    scene = PASOS(False)
+    scene.edtv = {"time": 0}
+    scene.use_point_arena = use_point_arena
+    scene.duration = scene_dict["duration"]
+    scene.timeline = timeline_from_lists(scene_dict["timeline"])
+    scene.invisible_objects = []
+    scene.construct()
+    return scene
+
+def get_points(scene):
+    import numpy as np
+    return np.concatenate([submob.points for mob in scene.pmobs for submob in mob.family_members_with_points()])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the point arena on a particle system.")
+    parser.add_argument("--dots", type=int, default=2000)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--fade", action="store_true")
+    args = parser.parse_args(argv)
+
+    import logging
+    import numpy as np
+    logging.getLogger("manim").setLevel(logging.ERROR)
+    from src.profiling import Profiler
+
+    scene_dict = generate_particles(args.dots, 2, args.fade)
+    frame_times = [0.2 + k * 2 / args.frames for k in range(args.frames)]
+    scenes = {"separate arrays": create_scene(scene_dict, False), "point arena": create_scene(scene_dict, True)}
+    update_mobs = {name: [] for name in scenes}
+    for frame_time in frame_times:
+        for name, scene in scenes.items():
+            scene.edtv["time"] = frame_time
+            start_time = time.perf_counter()
+            scene.update_mobs()
+            update_mobs[name].append(time.perf_counter() - start_time)
+        if not np.allclose(*[get_points(scene) for scene in scenes.values()]):
+            print(f"the points differ at t={frame_time}")
+            return 1
+
+    transforms = {}
+    for name, scene in scenes.items():
+        scene.profiler = Profiler()
+        scene.profiler.enabled = True
+        for frame_time in frame_times:
+            scene.edtv["time"] = frame_time
+            scene.update_mobs()
+        transforms[name] = scene.profiler.phases["transforms"][0] / len(frame_times)
+
+    import manim
+    print(f"manim {getattr(manim, '__version__', '(unknown version)')} from {manim.__file__}")
+    print(f"{args.dots} dots, {len(get_points(scenes['point arena']))} points, {args.frames} frames")
+    print(f"{'':<18}{'update_mobs ms':>16}{'transforms ms':>16}")
+    for name in scenes:
+        print(f"{name:<18}{1000 * statistics.median(update_mobs[name][1:]):>16.2f}{1000 * transforms[name]:>16.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
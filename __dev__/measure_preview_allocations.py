@@ -0,0 +1,65 @@
+# measures the memory allocated per frame when showing a rendered frame on the preview window, comparing the old path
+# (swapaxes + blit_array + transform.scale into a new surface) with preview.show_frame
+# pygame surfaces are allocated by SDL, so they're counted by wrapping pygame.Surface/transform.scale, and numpy
+# buffers with tracemalloc. it doesn't need manim (frames are random camera-like buffers) nor a display
+# run it from the repository root: python __dev__/measure_preview_allocations.py [width] [height]
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from src import preview
+
+WIDTH = int(sys.argv[1]) if len(sys.argv) > 1 else 1920
+HEIGHT = int(sys.argv[2]) if len(sys.argv) > 2 else 1080
+FRAMES = 200
+WARMUP = 10
+
+def old_path(V, frame):
+    pygame.surfarray.blit_array(V.surf, np.swapaxes(frame[:, :, :3], 0, 1))
+    V.window.blit(pygame.transform.scale(V.surf, V.window_resolution), (0, 0))
+
+def measure(show, V, frame):
+    for _ in range(WARMUP):
+        show(V, frame)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start_time = time.perf_counter()
+    for k in range(FRAMES):
+        frame[0, 0, 0] = k % 256 # the camera draws into the same buffer every frame
+        show(V, frame)
+    elapsed = time.perf_counter() - start_time
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms_per_frame": 1000 * elapsed / FRAMES, "numpy_peak_bytes": peak}
+
+if __name__ == "__main__":
+    pygame.init()
+    window_resolution = (853, 480)
+    window = pygame.display.set_mode(window_resolution)
+    frame = np.random.randint(0, 255, (HEIGHT, WIDTH, 4), dtype=np.uint8)
+
+    old_V = SimpleNamespace(window=window, window_resolution=window_resolution, surf=pygame.Surface((WIDTH, HEIGHT)))
+    new_V = SimpleNamespace(window=window, window_resolution=window_resolution, frame_surf=None, frame_surf_source=None, scaled_surf=None)
+    results = {}
+    for name, show, V in [("old", old_path, old_V), ("show_frame", preview.show_frame, new_V)]:
+        scaled_surfaces = 0
+        original_scale = pygame.transform.scale
+        def counting_scale(surface, size, dest_surface=None):
+            global scaled_surfaces
+            scaled_surfaces += dest_surface == None
+            return original_scale(surface, size, dest_surface) if dest_surface != None else original_scale(surface, size)
+        pygame.transform.scale = counting_scale
+        results[name] = measure(show, V, frame)
+        results[name]["new_surfaces_per_frame"] = scaled_surfaces / (FRAMES + WARMUP)
+        pygame.transform.scale = original_scale
+
+    for name, result in results.items():
+        print(f"{name:<12}{result['ms_per_frame']:>8.2f} ms/frame   numpy peak {result['numpy_peak_bytes']:>10} bytes   new scaled surfaces/frame {result['new_surfaces_per_frame']:.0f}")
+    pygame.quit()
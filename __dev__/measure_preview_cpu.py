@@ -0,0 +1,58 @@
+# measures the CPU used by the editor + preview in each state (visible and paused, playing, hidden).
+# it only clicks the editor's own buttons, so it can be run on older commits to compare
+# run it from the repository root: python __dev__/measure_preview_cpu.py [scene.json] [seconds per state]
+# without a display, SDL_VIDEODRIVER=dummy and QT_QPA_PLATFORM=offscreen run it headless. the windows aren't drawn then,
+# so "playing" only counts the rendering of the frames, but the paused and hidden loops cost the same
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
+from src.pasos import PASOS
+from src.preview import run_preview
+from src.editor import EditorWindow
+from src.scene_file import read_scene_file
+
+SCENE_PATH = sys.argv[1] if len(sys.argv) > 1 else str(Path(__file__).resolve().parent.parent / "scenes/scene1.json")
+SECONDS_PER_STATE = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+if __name__ == "__main__":
+    preview = PASOS(False)
+    app = QApplication(sys.argv)
+    window = EditorWindow(preview)
+    file_dict = read_scene_file(SCENE_PATH)
+    preview.duration = file_dict["duration"]
+    preview.timeline = file_dict["timeline"]
+    preview.invisible_objects = file_dict["invisible_objects"]
+    preview.update_visible_mobs()
+    preview.edtv["playing_speed"] = preview.duration / SECONDS_PER_STATE / 2 # so playing doesn't stop before the state ends
+    window.show()
+    threading.Thread(target=run_preview, args=(preview,)).start()
+
+    results = {}
+    states = [
+        ("visible_paused", lambda: None),
+        ("playing", lambda: window.mbtn_play.click()),
+        ("hidden", lambda: (window.scene.edtv["playing"] and window.mbtn_play.click(), window.preview_menu_action.trigger())),
+        ]
+    sample = {}
+
+    def next_state(k=0):
+        now_cpu, now_wall = time.process_time(), time.perf_counter()
+        if k > 0:
+            results[states[k-1][0]] = {"cpu_percent": 100 * (now_cpu - sample["cpu"]) / (now_wall - sample["wall"])}
+        if k == len(states):
+            print(json.dumps(results, indent=4))
+            window.unsaved_changes = False
+            window.close()
+            return
+        states[k][1]()
+        QTimer.singleShot(1000, lambda: sample.update(cpu=time.process_time(), wall=time.perf_counter())) # 1s to settle
+        QTimer.singleShot(int(1000 + SECONDS_PER_STATE * 1000), lambda: next_state(k + 1))
+
+    QTimer.singleShot(2000, next_state)
+    sys.exit(app.exec())
@@ -0,0 +1,85 @@
+# measures how long the editor takes to show a window, and what the imports on the way cost (python -X importtime).
+# every measurement runs in a new interpreter so nothing is imported already. run it from the repository root:
+#   python __dev__/measure_startup.py [--repeat N]
+# to compare with an older version, run it in a worktree of that commit (git worktree add ../old <commit>)
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULES = ["PyQt6.QtWidgets", "pygame", "tqdm", "manim", "src.editor", "src.preview", "src.export", "src.pasos"]
+
+# what main.pyw does until its first window (the splash screen) is visible, and until the editor window is
+SPLASH_SCRIPT = """
+import runpy, sys
+from PyQt6.QtWidgets import QSplashScreen, QWidget
+shown = set()
+def show(self, *args):
+    if type(self).__name__ not in shown:
+        shown.add(type(self).__name__)
+        print("shown:", type(self).__name__, flush=True)
+    if type(self).__name__ == "EditorWindow":
+        sys.exit(0)
+QSplashScreen.show = show
+QWidget.show = show
+sys.argv = ["main.pyw"]
+runpy.run_path("main.pyw", run_name="__main__")
+"""
+
+# cumulative microseconds of the top-level import of `module`
+def get_import_time(module: str) -> float:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\S+)$", line)
+        if match and match.group(2) == module:
+            return int(match.group(1))
+    return None
+
+# version and location of the manim that the measurements import, so numbers taken with another install aren't mixed up
+def get_manim_info() -> str:
+    result = subprocess.run([sys.executable, "-c", "import manim; print(getattr(manim, '__version__', 'unknown version'), manim.__file__)"], cwd=ROOT, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else "not installed"
+
+# seconds from starting the interpreter to every window that main.pyw shows
+def get_window_times() -> dict:
+    start_time = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", SPLASH_SCRIPT], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    times = {}
+    for line in process.stdout:
+        if line.startswith("shown: "): # pygame prints its own lines
+            times[line[7:].strip()] = time.perf_counter() - start_time
+    process.wait()
+    return times
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the startup time of the editor.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"manim: {get_manim_info()}\n")
+    print(f"{'import':<20}{'ms':>10}")
+    for module in MODULES:
+        samples = [get_import_time(module) for _ in range(args.repeat)]
+        if None in samples:
+            print(f"{module:<20}{'failed':>10}")
+        else:
+            print(f"{module:<20}{statistics.median(samples) / 1000:>10.1f}")
+
+    windows = {}
+    for _ in range(args.repeat):
+        for window, seconds in get_window_times().items():
+            windows.setdefault(window, []).append(seconds)
+    print(f"\n{'window shown':<20}{'ms':>10}")
+    if not windows:
+        print("main.pyw didn't show any window")
+    for window, samples in windows.items():
+        print(f"{window:<20}{1000 * statistics.median(samples):>10.1f}")
+
+if __name__ == "__main__":
+    main()
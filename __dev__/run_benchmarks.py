@@ -0,0 +1,197 @@
+# times the main parts of the engine on a synthetic (or given) scene and writes the results as JSON, so runs can be
+# compared between commits. run it from the repository root:
+#   python __dev__/run_benchmarks.py -o results.json [--mobs N] [--events M] [--mix ...] [--scene file] [--skip export]
+# every benchmark is independent, if one fails (e.g. there's no ffmpeg for the export) its error is recorded instead
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # the timeline canvas is painted without a display
+
+from generate_scene import DEFAULT_MIX, parse_mix, generate_scene
+from src.headless import parse_resolution
+from src.scene_file import read_scene_file
+from src.timeline_model import timeline_from_lists
+
+BENCHMARKS = ["pasos_eval", "frames", "timeline_paint", "export"]
+
+def summarize(samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": 1000 * statistics.fmean(samples),
+        "median_ms": 1000 * statistics.median(samples),
+        "p95_ms": 1000 * samples[min(int(len(samples) * 0.95), len(samples) - 1)],
+        "max_ms": 1000 * samples[-1],
+    }
+
+def create_scene(scene_dict: dict):
+    from src.pasos import PASOS
+    scene = PASOS(False)
+    scene.edtv = {"time": 0}
+    scene.duration = scene_dict["duration"]
+    scene.timeline = scene_dict["timeline"]
+    scene.invisible_objects = scene_dict["invisible_objects"]
+    scene.construct()
+    return scene
+
+def get_frame_times(scene_dict: dict, max_frames: int) -> list:
+    from manim import config
+    from src.pasos import get_n_of_frames
+    n_of_frames = min(get_n_of_frames(scene_dict["duration"], config.frame_rate), max_frames)
+    return [k / config.frame_rate for k in range(n_of_frames)]
+
+# every formula body of the scene, compiled (cold) and then taken from the formula cache (warm)
+def benchmark_pasos_eval(scene_dict: dict, args) -> dict:
+    from src.expression_evaluator import pasos_eval, FORMULA_CACHE
+    scene = create_scene(scene_dict)
+    expressions = set()
+    for row in scene_dict["timeline"]:
+        for p_event in row:
+            f = p_event.formula
+            expressions.add("lambda t: " + f[3:] if f[:3] == "E: " else f[3:])
+    expressions = sorted(expressions)
+    FORMULA_CACHE.clear()
+    cold = []
+    for expr in expressions:
+        start_time = time.perf_counter()
+        pasos_eval(expr, scene.nv)
+        cold.append(time.perf_counter() - start_time)
+    warm = []
+    for _ in range(args.repeat):
+        for expr in expressions:
+            start_time = time.perf_counter()
+            pasos_eval(expr, scene.nv)
+            warm.append(time.perf_counter() - start_time)
+    return {"expressions": len(expressions), "cold": summarize(cold), "warm": summarize(warm)}
+
+# update_mobs and renderer.update_frame at every frame time, like the preview does when playing
+def benchmark_frames(scene_dict: dict, args) -> dict:
+    scene = create_scene(scene_dict)
+    update_mobs, update_frame = [], []
+    for frame_time in get_frame_times(scene_dict, args.max_frames):
+        scene.edtv["time"] = frame_time
+        start_time = time.perf_counter()
+        scene.update_mobs()
+        update_mobs.append(time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+        scene.renderer.update_frame(scene)
+        update_frame.append(time.perf_counter() - start_time)
+    return {"update_mobs": summarize(update_mobs), "update_frame": summarize(update_frame)}
+
+# full repaints (the static layer is rebuilt) and cursor-only repaints of TimeLineCanvas, offscreen
+def benchmark_timeline_paint(scene_dict: dict, args) -> dict:
+    from PyQt6.QtWidgets import QApplication, QScrollArea
+    from PyQt6.QtCore import QRect
+    from src.timeline_editor import TimeLineCanvas
+    app = QApplication.instance() or QApplication([])
+    scene = create_scene(scene_dict)
+    scroll_area = QScrollArea()
+    canvas = TimeLineCanvas(scene, scroll_area)
+    scroll_area.setWidget(canvas)
+    scroll_area.resize(*args.canvas_size)
+    scroll_area.show()
+    app.processEvents()
+    full, cursor = [], []
+    for k in range(args.repeat):
+        scene.timeline_version += 1 # as if the timeline was edited
+        start_time = time.perf_counter()
+        canvas.repaint()
+        full.append(time.perf_counter() - start_time)
+        scene.edtv["time"] = k * scene.duration / args.repeat
+        start_time = time.perf_counter()
+        x = 100 + int(scene.edtv["time"] * canvas.sec_width)
+        canvas.repaint(QRect(x - 1, 0, 3, canvas.height()))
+        cursor.append(time.perf_counter() - start_time)
+    scroll_area.close()
+    return {"canvas_size": list(args.canvas_size), "full": summarize(full), "cursor": summarize(cursor)}
+
+def benchmark_export(scene_dict: dict, args) -> dict:
+    from src.headless import render_scene
+    n_of_frames = len(get_frame_times(scene_dict, args.max_frames))
+    with tempfile.TemporaryDirectory() as directory:
+        return render_scene(scene_dict, str(Path(directory) / "benchmark.mp4"), (0, n_of_frames))
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the PASOS engine.")
+    parser.add_argument("-o", "--output", required=True, help="JSON file with the results")
+    parser.add_argument("--scene", help="use this scene file instead of a generated one")
+    parser.add_argument("--mobs", type=int, default=20, help="mobjects of the generated scene")
+    parser.add_argument("--events", type=int, default=4, help="events per track of the generated scene")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="formula type weights of the generated scene")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of the generated scene")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-r", "--resolution", type=parse_resolution, help="WIDTHxHEIGHT of the rendered frames")
+    parser.add_argument("--fps", type=float, help="frame rate")
+    parser.add_argument("--max-frames", type=int, default=120, help="frames timed by update_mobs, update_frame and export")
+    parser.add_argument("--repeat", type=int, default=50, help="repetitions of pasos_eval and of the canvas repaints")
+    parser.add_argument("--canvas-size", type=parse_resolution, default=(1280, 600), help="WIDTHxHEIGHT of the timeline view")
+    parser.add_argument("--skip", nargs="*", default=[], choices=BENCHMARKS, help="benchmarks that aren't run")
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.getLogger("manim").setLevel(logging.ERROR)
+    from manim import config
+    if args.resolution:
+        config.pixel_width, config.pixel_height = args.resolution
+    if args.fps:
+        config.frame_rate = args.fps
+
+    if args.scene:
+        scene_dict = read_scene_file(args.scene, lazy=False)
+        scene_info = {"file": args.scene}
+    else:
+        scene_dict = generate_scene(args.mobs, args.events, args.mix, args.duration, args.seed)
+        scene_dict["timeline"] = timeline_from_lists(scene_dict["timeline"])
+        scene_info = {"mobs": args.mobs, "events_per_track": args.events, "mix": args.mix, "duration": args.duration, "seed": args.seed}
+    scene_info["events"] = sum(len(row) for row in scene_dict["timeline"])
+
+    runners = {
+        "pasos_eval": benchmark_pasos_eval,
+        "frames": benchmark_frames,
+        "timeline_paint": benchmark_timeline_paint,
+        "export": benchmark_export,
+    }
+    results = {}
+    for name in BENCHMARKS:
+        if name in args.skip:
+            continue
+        print(f"running {name}...", flush=True)
+        try:
+            results[name] = runners[name](scene_dict, args)
+        except Exception as e:
+            traceback.print_exc()
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+
+    report = {
+        "commit": get_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "resolution": [config.pixel_width, config.pixel_height],
+        "fps": config.frame_rate,
+        "scene": scene_info,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(json.dumps(results, indent=4))
+    return int(any("error" in result for result in results.values()))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,39 @@
 import sys
 import threading
-from PyQt6.QtWidgets import QApplication
-
-from src.pasos import PASOS
-from src.preview import run_preview
-from src.editor import EditorWindow
-
-preview = PASOS(False)
-t1 = threading.Thread(target=run_preview, args=(preview,))
-app = QApplication(sys.argv)
-EditorWindow(preview).show()
-t1.start()
-sys.exit(app.exec())
+from pathlib import Path
+from PyQt6.QtWidgets import QApplication, QSplashScreen
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import Qt
+
+# importing manim takes seconds, so it's done in another thread (together with the names that formulas can use)
+# while the splash screen is already visible. the editor window needs the scene, which is a manim Scene, so it's
+# only created once manim is loaded
+def load_engine():
+    import src.pasos
+    from src.expression_evaluator import register_mobject_classes
+    register_mobject_classes()
+
+# the guard is needed because parallel export spawns processes that import this file again
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    splash = QSplashScreen(QPixmap(str(Path(__file__).resolve().parent / "icon_light.png")))
+    splash.showMessage("Loading manim...", Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignHCenter)
+    splash.show()
+    app.processEvents()
+    loader = threading.Thread(target=load_engine, daemon=True)
+    loader.start()
+
+    from src.preview import run_preview
+    from src.editor import EditorWindow
+    while loader.is_alive(): # keeps the splash screen responsive
+        app.processEvents()
+        loader.join(0.02)
+
+    from src.pasos import PASOS
+    preview = PASOS(False)
+    t1 = threading.Thread(target=run_preview, args=(preview,))
+    window = EditorWindow(preview)
+    window.show()
+    splash.finish(window)
+    t1.start()
+    sys.exit(app.exec())
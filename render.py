@@ -0,0 +1,6 @@
+import sys
+from src.headless import main
+
+# the export workers are spawned processes that import this file again
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,20 @@
 import os
 from pathlib import Path
-import json
 import math
+import queue
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QFileDialog, QMessageBox, QHBoxLayout, QVBoxLayout, QGridLayout,
-                             QGroupBox, QScrollArea, QLabel, QLineEdit, QSlider, QPushButton, QStyle, QSizePolicy)
+                             QGroupBox, QScrollArea, QInputDialog, QLabel, QLineEdit, QSlider, QPushButton, QStyle, QSizePolicy)
 from PyQt6.QtGui import QIcon
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
 from .export import ExportDialog
 from .timeline_editor import TimeLineCanvas
 from .event_editor import EventEditor
+from .scene_file import read_scene_file, write_scene_file, copy_scene_dict
+from .journal import EditJournal, read_journal, replay_journal
 
 KRPATH = str(Path(__file__).resolve().parent.parent) + "/"
+SCENE_FILE_FILTER = "PASOS Scenes (*.json *.pasosb);; JSON Files (*.json);; PASOS Binary Scenes (*.pasosb)"
+JOURNAL_FLUSH_INTERVAL = 500 # ms between writes of the edited rows to the journal, dragging an event edits it at every mouse move
 
 def create_menubar(window, menubar):
     file_menu = menubar.addMenu("File")
@@ -29,16 +33,44 @@ def create_menubar(window, menubar):
     file_menu_action = file_menu.addAction("Save As...")
     file_menu_action.setShortcut("Ctrl+Alt+S")
     file_menu_action.triggered.connect(window.save_file_as)
+    file_menu_action = file_menu.addAction("Autosave")
+    file_menu_action.setCheckable(True)
+    file_menu_action.setChecked(window.scene.edtv["autosave"])
+    file_menu_action.triggered.connect(lambda checked: window.scene.edtv.update(autosave=checked))
     file_menu_action = file_menu.addAction("Export")
     file_menu_action.setIcon(window.style().standardIcon(QStyle.StandardPixmap.SP_DriveNetIcon))
     file_menu_action.setShortcut("Ctrl+E")
     file_menu_action.triggered.connect(window.export_scene)
+    file_menu_action = file_menu.addAction("Export Workers...")
+    file_menu_action.triggered.connect(window.set_export_workers)
 
     preview_menu = menubar.addMenu("Preview")
     window.preview_menu_action = preview_menu.addAction("Visible")
     window.preview_menu_action.setCheckable(True)
     window.preview_menu_action.setChecked(True)
-    window.preview_menu_action.triggered.connect(lambda checked: window.call_edtv_func(checked, "set_preview_visibility"))
+    window.preview_menu_action.triggered.connect(lambda checked: window.send_preview_command("set_preview_visibility", checked))
+    preview_menu_action = preview_menu.addAction("Draft While Playing/Scrubbing")
+    preview_menu_action.setCheckable(True)
+    preview_menu_action.setChecked(window.scene.edtv["draft_preview"])
+    preview_menu_action.triggered.connect(lambda checked: window.scene.edtv.update(draft_preview=checked))
+    preview_menu_action = preview_menu.addAction("Draft Resolution...")
+    preview_menu_action.triggered.connect(window.set_draft_scale)
+    preview_menu_action = preview_menu.addAction("Frame Cache Size...")
+    preview_menu_action.triggered.connect(window.set_preview_cache_size)
+    preview_menu_action = preview_menu.addAction("Look-ahead Workers...")
+    preview_menu_action.triggered.connect(window.set_prerender_workers)
+    preview_menu_action = preview_menu.addAction("Profiling (Overlay and Export Reports)")
+    preview_menu_action.setCheckable(True)
+    preview_menu_action.setChecked(window.scene.edtv["profiling"])
+    preview_menu_action.triggered.connect(window.set_profiling)
+    preview_menu_action = preview_menu.addAction("Tabulated Easings (Preview and Export)")
+    preview_menu_action.setCheckable(True)
+    preview_menu_action.setChecked(window.scene.edtv["tabulated_rate_functions"])
+    preview_menu_action.triggered.connect(window.set_tabulated_rate_functions)
+    preview_menu_action = preview_menu.addAction("Point Arena (Preview and Export)")
+    preview_menu_action.setCheckable(True)
+    preview_menu_action.setChecked(window.scene.edtv["use_point_arena"])
+    preview_menu_action.triggered.connect(window.set_point_arena)
 
 def create_time_edit(window, layout1):
     window.time_edit = QSlider(Qt.Orientation.Horizontal)
@@ -99,6 +131,7 @@ def create_timeline_edit(window, layout1, layout3):
     window.timeline_edit = QScrollArea()
     window.timeline_canvas = TimeLineCanvas(window.scene, window.timeline_edit)
     window.timeline_canvas.timeline_changed.connect(lambda: window.update_unsaved_changes_flag(True))
+    window.timeline_canvas.timeline_changed.connect(lambda: window.send_preview_command("redraw"))
     window.timeline_edit.setWidget(window.timeline_canvas)
     window.timeline_edit.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
     window.timeline_edit.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
@@ -143,14 +176,43 @@ def create_event_edit(window, layout1):
     window.event_editor_widget.open_event(None)
     window.timeline_canvas.edit_event.connect(window.event_editor_widget.open_event)
     window.timeline_canvas.timeline_changed.connect(window.event_editor_widget.update_event_variables)
+    # edits made in the event editor are notified like the ones made in the timeline (the canvas only has to be repainted,
+    # connecting them to timeline_canvas.timeline_changed would set the text of the field being edited)
+    window.event_editor_widget.timeline_changed.connect(lambda: window.update_unsaved_changes_flag(True))
+    window.event_editor_widget.timeline_changed.connect(lambda: window.send_preview_command("redraw"))
+    window.event_editor_widget.timeline_changed.connect(window.timeline_canvas.update)
     temp = QVBoxLayout()
     temp.addWidget(window.event_editor_widget)
     event_editor_box.setLayout(temp)
     layout1.addWidget(event_editor_box)
 
+# writes a copy of the scene, so saving big scenes doesn't freeze the editor
+class SaveThread(QThread):
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filepath, scene_dict, journal, journal_snapshot):
+        super().__init__()
+        self.filepath = filepath
+        self.scene_dict = scene_dict
+        self.journal = journal
+        self.journal_snapshot = journal_snapshot
+
+    def run(self):
+        try:
+            write_scene_file(self.filepath, self.scene_dict)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.journal.mark_saved(self.journal_snapshot, self.filepath) # done here, so it happens even if the editor is closing
+        self.saved.emit(self.filepath)
+
 class EditorWindow(QMainWindow):
     current_filepath = "untitled"
     updating_time_slider = False
+    journal = None # EditJournal of the open file, None for untitled scenes
+    save_thread = None
+    autosave_failed = False # then the journal is only compacted until the scene is saved by hand
 
     def update_unsaved_changes_flag(self, value):
         self.unsaved_changes = value
@@ -161,8 +223,8 @@ class EditorWindow(QMainWindow):
         
         self.scene = scene
         scene.construct()
-        scene.edtv = {"function_call": [], "time": 0, "playing_speed": 1, "scroll_speed": 0.1, "playing": False, "timeline_sec_width": 60}
-        # function_call is a list made to pass signals between pygame and pyqt. for example, when pyqt is closed, it appends "quit" to function_call (line 400), then pygame reads that (line 178) and stops running
+        scene.edtv = {"preview_commands": queue.Queue(), "time": 0, "playing_speed": 1, "scroll_speed": 0.1, "playing": False, "timeline_sec_width": 60, "export_workers": 1, "preview_cache_mb": 256, "preview_fps": 30, "prerender_workers": 2, "prerender_buffer": 30, "draft_preview": False, "draft_scale_percent": 100, "profiling": False, "tabulated_rate_functions": False, "use_point_arena": False, "autosave": True}
+        # preview_commands is a queue made to pass signals from pyqt to pygame. for example, when pyqt is closed, it sends ("quit",) (see closeEvent), then the preview thread wakes up, reads that (see preview.handle_command) and stops running
 
         self.scene.edtv["editor_window_object"] = self
         self.update_unsaved_changes_flag(False)
@@ -194,10 +256,17 @@ class EditorWindow(QMainWindow):
         for column, size in enumerate([70, 5, 1, 1]):
             layout3.setStretch(column, size)
 
+        self.journal_timer = QTimer(self)
+        self.journal_timer.timeout.connect(self.flush_journal)
+        self.journal_timer.start(JOURNAL_FLUSH_INTERVAL)
+
     # file menu functions
     def new_file(self):
+        self.wait_for_save() # the scene being saved can't be replaced until it's written
         self.scene.duration = 1
         self.scene.timeline = []
+        self.scene.edited_rows.clear()
+        self.journal = None
         self.scene.invisible_objects = []
         self.duration_edit.setText(str(self.scene.duration))
         self.timeline_canvas.update()
@@ -206,41 +275,113 @@ class EditorWindow(QMainWindow):
         self.current_filepath = "untitled"
         self.update_unsaved_changes_flag(False)
     def open_file(self):
-        filepath, _ = QFileDialog.getOpenFileName(self, caption="Open File", directory="", filter="JSON Files (*.json)")
+        filepath, _ = QFileDialog.getOpenFileName(self, caption="Open File", directory="", filter=SCENE_FILE_FILTER)
         if filepath == "":
             return
-        with open(filepath, "r") as f:
-            file_dict = json.load(f)
-            self.scene.duration = file_dict["duration"]
-            self.scene.timeline = file_dict["timeline"]
-            self.scene.invisible_objects = file_dict["invisible_objects"]
+        self.wait_for_save() # the file could be the one being saved, and its journal can't be opened twice
+        try:
+            file_dict = read_scene_file(filepath) # binary scenes only load the rows that are used
+        except ValueError as e:
+            QMessageBox.critical(self, "Invalid scene", str(e))
+            return
+        self.journal = EditJournal(filepath)
+        records = read_journal(filepath)
+        recovered = False
+        if records: # the editor was closed without saving or discarding these edits
+            answer = QMessageBox.question(self, "Recover changes", "This scene has unsaved changes from a previous session. Want to recover them?")
+            recovered = answer == QMessageBox.StandardButton.Yes
+        if recovered:
+            replay_journal(file_dict, records)
+            self.journal.resume(records)
+        else:
+            self.journal.close()
+        self.scene.duration = file_dict["duration"]
+        self.scene.timeline = file_dict["timeline"]
+        self.scene.invisible_objects = file_dict["invisible_objects"]
+        self.scene.edited_rows.clear()
         self.duration_edit.setText(str(self.scene.duration))
         self.timeline_canvas.update()
         self.set_time_to(0)
         self.scene.update_visible_mobs()
         self.current_filepath = filepath
-        self.update_unsaved_changes_flag(False)
+        self.update_unsaved_changes_flag(recovered)
     def save_file(self):
         self.save_file_as(self.current_filepath)
     def save_file_as(self, filepath):
         if filepath == "untitled" or isinstance(filepath, bool):
-            filepath, _ = QFileDialog.getSaveFileName(self, caption="Save As", directory="", filter="JSON Files (*.json)")
+            filepath, _ = QFileDialog.getSaveFileName(self, caption="Save As", directory="", filter="JSON Files (*.json);; PASOS Binary Scenes (*.pasosb)")
             if filepath == "":
                 return
-        with open(filepath, "w") as f:
-            file_dict = {
-                "duration": self.scene.duration,
-                "timeline": self.scene.timeline,
-                "invisible_objects": self.scene.invisible_objects
-                }
-            json.dump(file_dict, f, indent=4)
+        self.flush_journal()
+        self.wait_for_save()
+        if self.journal == None:
+            self.journal = EditJournal(filepath)
+        self.autosave_failed = False
+        self.start_save_thread(filepath)
         self.current_filepath = filepath
         self.update_unsaved_changes_flag(False)
+    def start_save_thread(self, filepath):
+        # the edits made while the copy is written are still unsaved, they stay in the journal
+        self.save_thread = SaveThread(filepath, copy_scene_dict(self.scene), self.journal, self.journal.snapshot())
+        self.save_thread.failed.connect(self.save_failed)
+        self.save_thread.start()
+    # the journal grew too big: the scene is saved in the background, which empties the journal (the edits made since the
+    # save started stay), or if autosave is off the journal only keeps the last record of every row
+    def compact_journal(self):
+        if not self.scene.edtv["autosave"] or self.autosave_failed:
+            self.journal.start_compaction()
+        elif self.save_thread == None or self.save_thread.isFinished():
+            journal = self.journal
+            self.start_save_thread(self.current_filepath)
+            self.save_thread.saved.connect(lambda: journal is self.journal and self.update_unsaved_changes_flag(bool(self.scene.edited_rows) or journal.has_unsaved_records()))
+            self.save_thread.failed.connect(lambda: setattr(self, "autosave_failed", True))
+    def save_failed(self, error):
+        self.update_unsaved_changes_flag(True)
+        QMessageBox.critical(self, "Save failed", error)
+    def wait_for_save(self):
+        if self.save_thread != None:
+            self.save_thread.wait()
+
+    # writes the rows edited since the last flush to the journal
+    def flush_journal(self):
+        if not self.scene.edited_rows:
+            return
+        rows = sorted(self.scene.edited_rows)
+        self.scene.edited_rows.clear()
+        if self.journal != None:
+            self.journal.record_rows(self.scene.timeline, rows)
+            if self.journal.needs_compaction():
+                self.compact_journal()
     def export_scene(self):
         movie_path, _ = QFileDialog.getSaveFileName(self, caption="Export As", directory="", filter="MPEG4 (*.mp4);; MOV (*.mov);; GIF (*.gif)")
         if movie_path == "":
             return
-        ExportDialog(self.scene, movie_path).exec()
+        ExportDialog(self.scene, movie_path, self.scene.edtv["export_workers"], self.scene.edtv["profiling"], self.scene.edtv["tabulated_rate_functions"], self.scene.edtv["use_point_arena"]).exec()
+    def set_draft_scale(self):
+        percent, ok = QInputDialog.getInt(self, "Draft Resolution", "Draft resolution (% of the preview window):", self.scene.edtv["draft_scale_percent"], 10, 100)
+        if ok:
+            self.scene.edtv["draft_scale_percent"] = percent
+    def set_preview_cache_size(self):
+        size, ok = QInputDialog.getInt(self, "Frame Cache Size", "Memory used to keep rendered preview frames (MB, 0 disables it):", self.scene.edtv["preview_cache_mb"], 0, 65536)
+        if ok:
+            self.scene.edtv["preview_cache_mb"] = size
+    def set_prerender_workers(self):
+        workers, ok = QInputDialog.getInt(self, "Look-ahead Workers", "Processes rendering frames ahead while playing (0 renders in the preview thread):", self.scene.edtv["prerender_workers"], 0, os.cpu_count() or 1)
+        if ok:
+            self.scene.edtv["prerender_workers"] = workers
+    def set_profiling(self, checked):
+        self.scene.edtv["profiling"] = checked
+        self.send_preview_command("set_profiling", checked)
+    def set_tabulated_rate_functions(self, checked):
+        self.scene.edtv["tabulated_rate_functions"] = checked
+        self.send_preview_command("set_tabulated_rate_functions", checked) # the preview thread owns the keyframes
+    def set_point_arena(self, checked):
+        self.scene.edtv["use_point_arena"] = checked
+        self.send_preview_command("set_point_arena", checked)
+    def set_export_workers(self):
+        workers, ok = QInputDialog.getInt(self, "Export Workers", "Processes used to export (1 renders in a single process):", self.scene.edtv["export_workers"], 1, os.cpu_count() or 1)
+        if ok:
+            self.scene.edtv["export_workers"] = workers
     
     def unsaved_changes_message(self, action):
         msg = QMessageBox()
@@ -253,6 +394,10 @@ class EditorWindow(QMainWindow):
             msg.raise_()
             if answer == QMessageBox.StandardButton.Yes:
                 self.save_file()
+            if answer != QMessageBox.StandardButton.Cancel:
+                self.wait_for_save() # every action replaces or closes the scene, and a running save would write the journal again
+            if answer == QMessageBox.StandardButton.No and self.journal != None:
+                self.journal.close() # the changes are discarded, so they aren't offered for recovery
             if answer != QMessageBox.StandardButton.Cancel:
                 action()
             return answer
@@ -264,7 +409,8 @@ class EditorWindow(QMainWindow):
         self.updating_time_slider = True
         self.time_edit.setValue(int(100 * self.scene.edtv["time"] / self.scene.duration))
         self.time_displayer.setText(f'Time: {self.scene.edtv["time"]:.2f}s')
-        self.timeline_canvas.update()
+        self.timeline_canvas.update_cursor()
+        self.send_preview_command("redraw")
     def time_slider_moved(self, value):
         if self.updating_time_slider:
             self.updating_time_slider = False
@@ -294,12 +440,13 @@ class EditorWindow(QMainWindow):
             new_duration = float(value)
             if new_duration <= 0:
                 return
+            if self.journal != None and new_duration != self.scene.duration:
+                self.journal.record_duration(new_duration)
             self.scene.duration = new_duration
             self.set_time_to(min(self.scene.edtv["time"], new_duration))
-            if self.timeline_canvas.hovered_event and new_duration < self.timeline_canvas.hovered_event[0]:
+            if self.timeline_canvas.hovered_event and new_duration < self.timeline_canvas.hovered_event.start:
                 self.timeline_canvas.hovered_event = None
                 self.timeline_canvas.selected_events.clear()
-                self.timeline_canvas.selected_events_mapping.clear()
                 self.timeline_canvas.resizing_side = None
                 self.timeline_canvas.resizing_flag = False
             self.timeline_canvas.update()
@@ -314,12 +461,12 @@ class EditorWindow(QMainWindow):
         else:
             self.scene.edtv["playing"] = True
             self.mbtn_play.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaStop))
-            self.scene.edtv["function_call"].append("start_playing")
+            self.send_preview_command("start_playing")
 
-    def call_edtv_func(self, *args):
-        self.scene.edtv["function_call"].extend(args)
+    def send_preview_command(self, *command):
+        self.scene.edtv["preview_commands"].put(command)
 
     def closeEvent(self, event):
-        answer = self.unsaved_changes_message(lambda: self.scene.edtv["function_call"].append("quit"))
+        answer = self.unsaved_changes_message(lambda: (self.wait_for_save(), self.send_preview_command("quit")))
         if answer == QMessageBox.StandardButton.Cancel:
             event.ignore()
@@ -1,27 +1,8 @@
-from pathlib import Path
-import json
+from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QFrame, QLabel, QLineEdit, QComboBox, QSizePolicy
 from . import utils
-
-KRPATH = str(Path(__file__).resolve().parent.parent) + "/"
-
-manim_rate_functions = [
-    "linear", "smooth", "smoothstep", "rush_into",
-    "rush_from", "slow_into", "double_smooth", "there_and_back",
-    "there_and_back_with_pause", "running_start", "wiggle", "lingering",
-    "exponential_decay", "ease_in_sine", "ease_out_sine", "ease_in_out_sine",
-    "ease_in_quad", "ease_out_quad", "ease_in_out_quad", "ease_in_cubic",
-    "ease_out_cubic", "ease_in_out_cubic", "ease_in_quart", "ease_out_quart",
-    "ease_in_out_quart", "ease_in_quint", "ease_out_quint", "ease_in_out_quint",
-    "ease_in_expo", "ease_out_expo", "ease_in_out_expo", "ease_in_circ",
-    "ease_out_circ", "ease_in_out_circ", "ease_in_back", "ease_out_back",
-    "ease_in_out_back", "ease_in_elastic", "ease_out_elastic", "ease_in_out_elastic",
-    "ease_in_bounce", "ease_out_bounce", "ease_in_out_bounce", "ease_in_out_bounce"
-]
-
-sprite_classes = {}
-with open(KRPATH+"src/data/default_sprite_classes.json", "r") as f:
-    sprite_classes.update(json.load(f))
+from .rate_functions import manim_rate_functions
+from .timeline_editor import get_free_interval
 
 class QHSeparationLine(QFrame):
     def __init__(self):
@@ -33,7 +14,10 @@ class QHSeparationLine(QFrame):
         self.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Minimum)
 
 class EventEditor(QWidget):
+    timeline_changed = pyqtSignal() # same meaning as TimeLineCanvas.timeline_changed
     cur_event = None
+    cur_row_idx = 0
+    cur_event_idx = 0
 
     def __init__(self, scene):
         super().__init__()
@@ -48,7 +32,7 @@ class EventEditor(QWidget):
         start_label = QLabel("Start:")
         self.start_edit = QLineEdit()
         self.start_edit.textChanged.connect(self.change_event_value_signal(
-            0, lambda t: float(t), lambda x: 0 < x < scene.duration - self.cur_event[1]
+            "start", lambda t: float(t), self.start_is_free
             ))
         duration_label = QLabel("Duration:")
         self.duration_edit = QLineEdit()
@@ -62,8 +46,10 @@ class EventEditor(QWidget):
         layout2.addWidget(easing_label)
         layout2.addWidget(self.easing_edit)
     
-    def open_event(self, event):
+    def open_event(self, event, event_idx=0, row_idx=0):
         self.cur_event = event
+        self.cur_event_idx = event_idx
+        self.cur_row_idx = row_idx
         self.setDisabled(event == None)
         self.update_event_variables()
 
@@ -73,16 +59,23 @@ class EventEditor(QWidget):
             self.duration_edit.setText("")
             self.easing_edit.setCurrentIndex(0)
         else:
-            self.start_edit.setText(str(self.cur_event[0]))
-            self.duration_edit.setText(str(self.cur_event[1]))
-            self.easing_edit.setCurrentText(str(self.cur_event[2]))
+            self.start_edit.setText(str(self.cur_event.start))
+            self.duration_edit.setText(str(self.cur_event.duration))
+            self.easing_edit.setCurrentText(str(self.cur_event.easing))
     
-    def change_event_value_signal(self, index: int, conversion, condition):
+    # the event can't be moved over its neighbors, so the row stays sorted
+    def start_is_free(self, new_start):
+        left, right = get_free_interval(self.scene.timeline[self.cur_row_idx], self.cur_event_idx, self.scene.duration)
+        return left <= new_start <= right - self.cur_event.duration
+
+    def change_event_value_signal(self, attribute: str, conversion, condition):
         def signal(value):
             try:
                 new_value = conversion(value)
-                if condition(new_value):
-                    self.cur_event[index] = new_value
+                if getattr(self.cur_event, attribute) != new_value and condition(new_value): # open_event sets the text too
+                    setattr(self.cur_event, attribute, new_value)
+                    self.scene.invalidate_track(self.cur_row_idx)
+                    self.timeline_changed.emit()
             except Exception as Exc:
                 print(Exc)
         return signal
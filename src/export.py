@@ -1,21 +1,26 @@
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QProgressBar
 from PyQt6.QtCore import QThread, pyqtSignal
 
-# before importing manim, we have to kill its logger than tqdm because otherwise the program crashes when trying to render scenes
-import logging
-logging.getLogger("manim").setLevel(logging.ERROR) # this kills manim's logger
-import tqdm
-setattr(tqdm.tqdm, "__init__", lambda self, iterable, *args, **kwargs: setattr(self, "iterable", iterable))
-setattr(tqdm.tqdm, "__iter__", lambda self: iter(self.iterable))
-setattr(tqdm.tqdm, "update", lambda self: None)
-setattr(tqdm.tqdm, "close", lambda self: None) # these setattr functions kill manim's tqdm (tho this part might be dangerous because it might affect other libraries)
-from .pasos import PASOS
+# manim's tqdm crashes the program when rendering scenes from a thread, so it's disabled the first time something is
+# exported (not at import, tqdm and manim are imported only when they're needed so the editor starts faster)
+def disable_manim_progress_bars():
+    import logging
+    logging.getLogger("manim").setLevel(logging.ERROR) # this kills manim's logger
+    import tqdm
+    setattr(tqdm.tqdm, "__init__", lambda self, iterable, *args, **kwargs: setattr(self, "iterable", iterable))
+    setattr(tqdm.tqdm, "__iter__", lambda self: iter(self.iterable))
+    setattr(tqdm.tqdm, "update", lambda self: None)
+    setattr(tqdm.tqdm, "close", lambda self: None) # these setattr functions kill manim's tqdm (tho this part might be dangerous because it might affect other libraries)
 
 class ExportDialog(QDialog):
-    def __init__(self, scene, movie_path):
+    def __init__(self, scene, movie_path, workers=1, profile=False, tabulated_rate_functions=False, use_point_arena=False):
         super().__init__()
         self.scene = scene
         self.movie_path = movie_path
+        self.workers = workers
+        self.profile = profile
+        self.tabulated_rate_functions = tabulated_rate_functions
+        self.use_point_arena = use_point_arena
         self.setWindowTitle("Export Scene")
         
         layout1 = QVBoxLayout()
@@ -27,45 +32,45 @@ class ExportDialog(QDialog):
         self.status = QLabel("Rendering...")
         layout1.addWidget(self.status)
         
-        self.thread = ExportThread(self.scene, self.movie_path)
+        self.thread = ExportThread(self.scene, self.movie_path, self.workers, self.profile, self.tabulated_rate_functions, self.use_point_arena)
         self.thread.progress_callback.connect(lambda t: self.progress.setValue(int(t*100)))
         self.thread.finished.connect(self.exporting_finished)
         self.thread.start()
 
     def exporting_finished(self, output_path):
-        self.status.setText(f"Done! Saved at:\n{output_path}")
+        text = f"Done! Saved at:\n{output_path}"
+        if self.profile:
+            text += f"\nProfile report:\n{output_path}.profile.txt"
+        self.status.setText(text)
 
 class ExportThread(QThread):
     progress_callback = pyqtSignal(float)
     finished = pyqtSignal(str)
 
-    def __init__(self, scene, movie_path):
+    def __init__(self, scene, movie_path, workers=1, profile=False, tabulated_rate_functions=False, use_point_arena=False):
         super().__init__()
         self.scene = scene
         self.movie_path = movie_path
-        self.frames_rendered = 0
-        self.n_of_frames = int(scene.duration * scene.camera.frame_rate)
-    
-    def patched_write_frame(self, *args, **kwargs):
-        self.original_write_frame(*args, **kwargs)
-        self.frames_rendered += 1
-        progress_float = self.frames_rendered / self.n_of_frames
-        self.progress_callback.emit(progress_float)
+        self.workers = workers # more than 1 renders chunks of the scene in parallel processes
+        self.profile = profile # writes a report of the time spent in every phase of the frames next to the movie
+        self.tabulated_rate_functions = tabulated_rate_functions
+        self.use_point_arena = use_point_arena
 
     def run(self):
+        disable_manim_progress_bars()
+        from .headless import render_scene, render_scene_parallel, write_profile_report
         # a new scene is created for rendering so the editor's scene isn't modified
-        export_scene = PASOS(True)
-        export_scene.duration = self.scene.duration
-        export_scene.timeline = self.scene.timeline
-        export_scene.invisible_objects = self.scene.invisible_objects
-        
-        # monkey patch of FileWriter.write_frame
-        fw = export_scene.renderer.file_writer
-        self.original_write_frame = fw.write_frame
-        fw.write_frame = self.patched_write_frame
-        
-        # rendering
-        export_scene.renderer.file_writer.movie_file_path = self.movie_path
-        export_scene.render(True)
+        scene_dict = {
+            "duration": self.scene.duration,
+            "timeline": list(self.scene.timeline), # binary scenes load their rows lazily
+            "invisible_objects": self.scene.invisible_objects
+            }
+        progress = lambda done, total: self.progress_callback.emit(done / total)
+        if self.workers > 1:
+            result = render_scene_parallel(scene_dict, self.movie_path, self.workers, progress_callback=progress, profile=self.profile, tabulated_rate_functions=self.tabulated_rate_functions, use_point_arena=self.use_point_arena)
+        else:
+            result = render_scene(scene_dict, self.movie_path, progress_callback=progress, profile=self.profile, tabulated_rate_functions=self.tabulated_rate_functions, use_point_arena=self.use_point_arena)
+        if self.profile:
+            write_profile_report(result)
         self.finished.emit(self.movie_path)
-        self.deleteLater()
\ No newline at end of file
+        self.deleteLater()
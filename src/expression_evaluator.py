@@ -1,6 +1,8 @@
 import manim
 import numpy as np
 import ast
+import operator
+from collections import OrderedDict
 
 class EmptyVMobject(manim.VMobject): pass
 
@@ -63,8 +65,17 @@ def get_all_subclasses(cls):
     sc = cls.__subclasses__()
     return set(sc).union(s for c in sc for s in get_all_subclasses(c))
 
-for cls in get_all_subclasses(manim.VMobject):
-    NAMES[cls.__name__] = cls
+# walking every VMobject subclass is slow, so the classes are added to NAMES the first time a formula is compiled
+# (or by the thread that loads manim when the editor starts) instead of at import
+mobject_classes_registered = False
+
+def register_mobject_classes():
+    global mobject_classes_registered
+    if mobject_classes_registered:
+        return
+    for cls in get_all_subclasses(manim.VMobject):
+        NAMES[cls.__name__] = cls
+    mobject_classes_registered = True
 
 ATTRIBUTES = {
     list: frozenset(["index", "count"]),
@@ -176,7 +187,117 @@ class PNodeVisitor(ast.NodeVisitor):
             )
     
     def visit_Lambda(self, node):
-        raise NotImplementedError("I have no idea how to implement that")
+        raise NotImplementedError("lambdas are only supported by the closure backend (see PClosureCompiler)")
+
+    def generic_visit(self, node):
+        raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+
+# this is the second backend: instead of walking the tree at every evaluation, the tree is turned into nested closures once.
+# every closure receives the scene (for PMOBS) and a dict with the lambda arguments that are in scope
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: pow,
+    ast.MatMult: operator.matmul,
+}
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+    ast.Invert: operator.invert,
+    ast.Not: operator.not_,
+}
+
+allowed_attributes_by_type = {} # type -> frozenset of attribute names, so the MRO is only searched once per type
+
+def get_allowed_attributes(obj_type):
+    if obj_type not in allowed_attributes_by_type:
+        allowed_cls = next((cls for cls in obj_type.__mro__[::-1] if cls in ATTRIBUTES), None)
+        allowed_attributes_by_type[obj_type] = frozenset() if allowed_cls == None else ATTRIBUTES[allowed_cls]
+    return allowed_attributes_by_type[obj_type]
+
+class PClosureCompiler(ast.NodeVisitor):
+    def __init__(self, local_names=frozenset()):
+        super().__init__()
+        self.local_names = local_names
+
+    def visit_Call(self, node):
+        func = self.visit(node.func)
+        args = [self.visit(arg) for arg in node.args]
+        kwargs = [(kw.arg, self.visit(kw.value)) for kw in node.keywords]
+        if not kwargs:
+            return lambda scene, local: func(scene, local)(*[arg(scene, local) for arg in args])
+        return lambda scene, local: func(scene, local)(*[arg(scene, local) for arg in args], **{k: v(scene, local) for k, v in kwargs})
+
+    def visit_Attribute(self, node):
+        value = self.visit(node.value)
+        attr_name = node.attr
+        value_type_name = type(node.value).__name__
+        def attribute(scene, local):
+            obj = value(scene, local)
+            if attr_name not in get_allowed_attributes(type(obj)):
+                raise ValueError(f"Attribute '{value_type_name}.{attr_name}' not recognized")
+            return getattr(obj, attr_name)
+        return attribute
+
+    def visit_Name(self, node):
+        name = node.id
+        if name in self.local_names:
+            return lambda scene, local: local[name]
+        if name == "PMOBS":
+            return lambda scene, local: scene.pmobs
+        if name not in NAMES:
+            raise ValueError(f"Name '{name}' not recognized")
+        value = NAMES[name]
+        return lambda scene, local: value
+
+    def visit_List(self, node):
+        items = [self.visit(item) for item in node.elts]
+        return lambda scene, local: [item(scene, local) for item in items]
+
+    def visit_Constant(self, node):
+        value = ast.literal_eval(node)
+        return lambda scene, local: value
+
+    def visit_BinOp(self, node):
+        if type(node.op) not in BINARY_OPERATORS:
+            raise ValueError("Operator not recognized")
+        op = BINARY_OPERATORS[type(node.op)]
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        return lambda scene, local: op(left(scene, local), right(scene, local))
+
+    def visit_UnaryOp(self, node):
+        if type(node.op) not in UNARY_OPERATORS:
+            raise ValueError("Operator not recognized")
+        op = UNARY_OPERATORS[type(node.op)]
+        operand = self.visit(node.operand)
+        return lambda scene, local: op(operand(scene, local))
+
+    def visit_Subscript(self, node):
+        value = self.visit(node.value)
+        index = self.visit(node.slice)
+        return lambda scene, local: value(scene, local)[index(scene, local)]
+
+    def visit_Slice(self, node):
+        parts = [self.visit(part) if part != None else (lambda scene, local: None) for part in (node.lower, node.upper, node.step)]
+        return lambda scene, local: slice(*[part(scene, local) for part in parts])
+
+    def visit_Lambda(self, node):
+        if node.args.vararg or node.args.kwarg or node.args.kwonlyargs or node.args.defaults or node.args.posonlyargs:
+            raise ValueError("Only simple lambda arguments are supported")
+        params = [arg.arg for arg in node.args.args]
+        body = PClosureCompiler(self.local_names.union(params)).visit(node.body)
+        def make_function(scene, local):
+            def function(*args):
+                if len(args) != len(params):
+                    raise TypeError(f"lambda takes {len(params)} arguments but {len(args)} were given")
+                return body(scene, {**local, **dict(zip(params, args))})
+            return function
+        return make_function
 
     def generic_visit(self, node):
         raise ValueError(f"Unsupported syntax: {type(node).__name__}")
@@ -184,11 +305,94 @@ class PNodeVisitor(ast.NodeVisitor):
 def create_node_visitor(scene: manim.Scene):
     return PNodeVisitor(scene)
 
+# every node type PNodeVisitor knows how to evaluate (plus the helper nodes that live inside them)
+ALLOWED_NODES = (
+    ast.Call, ast.keyword, ast.Attribute, ast.Name, ast.List, ast.Constant, ast.BinOp, ast.UnaryOp,
+    ast.Subscript, ast.Slice, ast.Lambda, ast.arguments, ast.arg, ast.Load,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.MatMult,
+    ast.UAdd, ast.USub, ast.Invert, ast.Not
+)
+ALLOWED_ATTRIBUTE_NAMES = frozenset().union(*ATTRIBUTES.values())
+
+# this checks the whole tree against the allow-lists before it's ever evaluated,
+# attributes are checked again at run time because only then the type of the object is known
+def check_tree(node, local_names=frozenset()):
+    if not isinstance(node, ALLOWED_NODES):
+        raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+    if isinstance(node, ast.Name) and node.id != "PMOBS" and node.id not in NAMES and node.id not in local_names:
+        raise ValueError(f"Name '{node.id}' not recognized")
+    if isinstance(node, ast.Attribute) and node.attr not in ALLOWED_ATTRIBUTE_NAMES:
+        raise ValueError(f"Attribute '{type(node.value).__name__}.{node.attr}' not recognized")
+    if isinstance(node, ast.Lambda):
+        local_names = local_names.union(arg.arg for arg in node.args.args)
+    for child in ast.iter_child_nodes(node):
+        check_tree(child, local_names)
+
+# backend can be "closure" (compiled once into nested closures) or "visitor" (PNodeVisitor walks the tree at every call)
+def compile_formula(expr, backend="closure"):
+    register_mobject_classes()
+    tree = ast.parse(expr, mode="eval").body
+    check_tree(tree)
+    if backend == "visitor":
+        return lambda node_visitor: node_visitor.visit(tree)
+    if backend == "closure":
+        closure = PClosureCompiler().visit(tree)
+        return lambda node_visitor: closure(node_visitor.scene, {})
+    raise ValueError(f"Backend '{backend}' not recognized")
+
+# formulas are parsed and checked once, then reused every time the same text is evaluated
+class FormulaCache:
+    def __init__(self, maxsize=1024, backend="closure", names_maxsize=65536):
+        self.maxsize = maxsize
+        self.names_maxsize = names_maxsize # the names are small, so they're kept for every formula of big timelines
+        self.backend = backend
+        self.compiled = OrderedDict()
+        self.names = OrderedDict() # formula -> names it reads, so checking them (e.g. for PMOBS) doesn't parse it again
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, expr):
+        if expr in self.compiled:
+            self.hits += 1
+            self.compiled.move_to_end(expr)
+            return self.compiled[expr]
+        self.misses += 1
+        compiled = compile_formula(expr, self.backend)
+        self.compiled[expr] = compiled
+        if len(self.compiled) > self.maxsize:
+            self.compiled.popitem(last=False)
+        return compiled
+
+    def get_names(self, expr) -> frozenset:
+        if expr in self.names:
+            self.names.move_to_end(expr)
+            return self.names[expr]
+        names = frozenset(node.id for node in ast.walk(ast.parse(expr, mode="eval")) if isinstance(node, ast.Name))
+        self.names[expr] = names
+        if len(self.names) > self.names_maxsize:
+            self.names.popitem(last=False)
+        return names
+
+    def clear(self):
+        self.compiled.clear()
+        self.names.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.compiled), "maxsize": self.maxsize, "backend": self.backend}
+
+FORMULA_CACHE = FormulaCache()
+
+def formula_uses_name(expr, name) -> bool:
+    return name in FORMULA_CACHE.get_names(expr)
+
 def pasos_eval(expr, node_visitor):
-    return node_visitor.visit(ast.parse(expr, mode="eval").body)
+    return FORMULA_CACHE.get(expr)(node_visitor)
 
 if __name__ == "__main__":
     NAMES["quit"] = quit
+    FORMULA_CACHE.clear()
     nv = create_node_visitor(manim.Scene())
     while True:
         try:
@@ -198,4 +402,4 @@ if __name__ == "__main__":
             #    print(" ")
             print(pasos_eval(input(">>> "), nv))
         except Exception as e:
-            print(e)
\ No newline at end of file
+            print(e)
\ No newline at end of file
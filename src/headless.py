@@ -0,0 +1,257 @@
+# renders PASOS scene files without the editor, so it doesn't import PyQt6 or pygame.
+# progress and timing are printed to stdout as JSON lines
+import argparse
+import json
+import logging
+import multiprocessing
+import queue
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from .scene_file import read_scene_file
+from .profiling import merge_summaries, format_report
+
+def load_scene_file(path) -> dict:
+    return read_scene_file(path, lazy=False) # every row is rendered, and the dict is sent to other processes
+
+def parse_resolution(value: str) -> tuple:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+def parse_frame_range(value: str) -> tuple:
+    first_frame, last_frame = value.split(":")
+    return int(first_frame or 0), (int(last_frame) if last_frame else None)
+
+# renders frames [first_frame, last_frame) of a scene dict (as returned by load_scene_file) into movie_path.
+# progress_callback receives (frames_rendered, n_of_frames) after every frame
+def render_scene(scene_dict: dict, movie_path: str, frame_range=None, progress_callback=None, profile=False, tabulated_rate_functions=False, use_point_arena=False) -> dict:
+    logging.getLogger("manim").setLevel(logging.ERROR)
+    from manim import config
+    from .pasos import PASOS, get_n_of_frames
+    from .profiling import Profiler, instrument
+    config.progress_bar = "none"
+    config.disable_caching = True
+
+    export_scene = PASOS(True)
+    export_scene.duration = scene_dict["duration"]
+    export_scene.timeline = scene_dict["timeline"]
+    export_scene.invisible_objects = scene_dict["invisible_objects"]
+    export_scene.tabulated_rate_functions = tabulated_rate_functions
+    export_scene.use_point_arena = use_point_arena
+    export_scene.profiler = Profiler()
+    export_scene.profiler.enabled = profile
+
+    scene_frames = get_n_of_frames(export_scene.duration, export_scene.camera.frame_rate)
+    first_frame, last_frame = frame_range or (0, None)
+    last_frame = scene_frames if last_frame == None else min(last_frame, scene_frames)
+    if not 0 <= first_frame < last_frame:
+        raise ValueError(f"Invalid frame range {first_frame}:{last_frame} (the scene has {scene_frames} frames)")
+    if (first_frame, last_frame) != (0, scene_frames):
+        export_scene.frame_range = (first_frame, last_frame)
+    n_of_frames = last_frame - first_frame
+
+    # monkey patch of FileWriter.write_frame, the same way ExportThread does it
+    fw = export_scene.renderer.file_writer
+    original_write_frame = fw.write_frame
+    frames_rendered = 0
+    def write_frame(*args, **kwargs):
+        nonlocal frames_rendered
+        original_write_frame(*args, **kwargs)
+        frames_rendered += 1
+        if progress_callback:
+            progress_callback(frames_rendered, n_of_frames)
+    fw.write_frame = write_frame
+    instrument(fw, "write_frame", "encoding", lambda: export_scene.profiler)
+
+    start_time = time.perf_counter()
+    fw.movie_file_path = movie_path
+    export_scene.render(True)
+    elapsed = time.perf_counter() - start_time
+    result = {
+        "output": str(movie_path),
+        "first_frame": first_frame,
+        "last_frame": last_frame,
+        "frames": frames_rendered,
+        "seconds": elapsed,
+        "fps": frames_rendered / elapsed if elapsed else 0,
+    }
+    if profile:
+        result["profile"] = export_scene.profiler.summary()
+    return result
+
+# frames only depend on the timeline and the time (update_mobs doesn't accumulate state), so the frame range can be
+# split in chunks rendered by different processes. each worker has its own media_dir, so manim's partial movie files
+# don't collide, and receives the parent's manim config since spawned processes start with the default one
+def render_chunk(scene_dict: dict, chunk_path: str, frame_range: tuple, render_config: dict, progress_queue, chunk_idx: int, profile: bool, tabulated_rate_functions: bool, use_point_arena: bool) -> dict:
+    from manim import config
+    for key, value in render_config.items():
+        config[key] = value
+    config.media_dir = str(Path(chunk_path).parent / f"media_{chunk_idx}")
+    return render_scene(scene_dict, chunk_path, frame_range, lambda done, total: progress_queue.put((chunk_idx, done)), profile, tabulated_rate_functions, use_point_arena)
+
+# joins the chunks without re-encoding them (the packets are copied into the output container)
+# decoding delay of a movie: how long before its first frame is shown its first packet is decoded (b-frames), in seconds
+def get_decoding_delay(movie_path: str):
+    import av
+    with av.open(movie_path) as movie_input:
+        input_stream = movie_input.streams.video[0]
+        for packet in movie_input.demux(input_stream):
+            if packet.dts != None:
+                return ((input_stream.start_time or 0) - packet.dts) * input_stream.time_base
+    return 0
+
+# joins the chunks without re-encoding them. every chunk starts at its own time 0, so its timestamps are moved to where
+# the previous chunk ended. the encoder may choose a different decoding delay for each chunk, so the dts of every chunk
+# are also moved back to the biggest delay, otherwise they could go backwards where two chunks meet
+def concat_movies(movie_paths: list, output_path: str):
+    import av
+    delays = [get_decoding_delay(movie_path) for movie_path in movie_paths]
+    with av.open(output_path, mode="w") as output_container:
+        output_stream = None
+        offset = 0 # start of the current chunk in the output, in the time base of output_stream
+        for movie_path, delay in zip(movie_paths, delays):
+            with av.open(movie_path) as chunk_input:
+                input_stream = chunk_input.streams.video[0]
+                if output_stream == None:
+                    if hasattr(output_container, "add_stream_from_template"):
+                        output_stream = output_container.add_stream_from_template(input_stream)
+                    else:
+                        output_stream = output_container.add_stream(template=input_stream)
+                    time_base = input_stream.time_base
+                scale = input_stream.time_base / time_base
+                chunk_start = input_stream.start_time or 0
+                dts_shift = round((max(delays) - delay) / time_base)
+                chunk_end = offset
+                for packet in chunk_input.demux(input_stream):
+                    if packet.dts == None: # the empty packet that flushes the demuxer
+                        continue
+                    packet.pts = offset + round((packet.pts - chunk_start) * scale)
+                    packet.dts = offset + round((packet.dts - chunk_start) * scale) - dts_shift
+                    packet.duration = round(packet.duration * scale)
+                    packet.time_base = time_base
+                    chunk_end = max(chunk_end, packet.pts + packet.duration)
+                    packet.stream = output_stream
+                    output_container.mux(packet)
+                offset = chunk_end
+
+# same as render_scene, but the frames are rendered by a pool of processes. progress_callback receives the frames
+# rendered by all workers together, and the profile (if any) adds up the workers' profiles
+def render_scene_parallel(scene_dict: dict, movie_path: str, workers: int, frame_range=None, progress_callback=None, profile=False, tabulated_rate_functions=False, use_point_arena=False) -> dict:
+    if Path(movie_path).suffix.lower() == ".gif":
+        raise ValueError("GIF files can't be joined without re-encoding, export them with a single worker")
+    logging.getLogger("manim").setLevel(logging.ERROR)
+    from manim import config
+    from .pasos import get_n_of_frames
+
+    scene_frames = get_n_of_frames(scene_dict["duration"], config.frame_rate)
+    first_frame, last_frame = frame_range or (0, None)
+    last_frame = scene_frames if last_frame == None else min(last_frame, scene_frames)
+    if not 0 <= first_frame < last_frame:
+        raise ValueError(f"Invalid frame range {first_frame}:{last_frame} (the scene has {scene_frames} frames)")
+    n_of_frames = last_frame - first_frame
+    workers = max(1, min(workers, n_of_frames))
+    bounds = [first_frame + n_of_frames * k // workers for k in range(workers + 1)]
+    render_config = {"pixel_width": config.pixel_width, "pixel_height": config.pixel_height, "frame_rate": config.frame_rate}
+
+    start_time = time.perf_counter()
+    chunks_dir = Path(tempfile.mkdtemp(prefix="pasos_chunks_"))
+    try:
+        chunk_paths = [str(chunks_dir / f"chunk_{k:04d}{Path(movie_path).suffix}") for k in range(workers)]
+        context = multiprocessing.get_context("spawn") # forking a process with manim (and maybe Qt) loaded isn't safe
+        with context.Manager() as manager, ProcessPoolExecutor(workers, mp_context=context) as executor:
+            progress_queue = manager.Queue()
+            futures = [
+                executor.submit(render_chunk, scene_dict, chunk_paths[k], (bounds[k], bounds[k+1]), render_config, progress_queue, k, profile, tabulated_rate_functions, use_point_arena)
+                for k in range(workers)
+                ]
+            chunk_progress = [0] * workers
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                updated = False
+                while True:
+                    try:
+                        chunk_idx, done = progress_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    chunk_progress[chunk_idx] = done
+                    updated = True
+                if updated and progress_callback:
+                    progress_callback(sum(chunk_progress), n_of_frames)
+            results = [future.result() for future in futures] # raises the exception of a failed worker
+        concat_movies(chunk_paths, str(movie_path))
+    finally:
+        shutil.rmtree(chunks_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start_time
+    frames_rendered = sum(result["frames"] for result in results)
+    result = {
+        "output": str(movie_path),
+        "first_frame": first_frame,
+        "last_frame": last_frame,
+        "frames": frames_rendered,
+        "workers": workers,
+        "seconds": elapsed,
+        "fps": frames_rendered / elapsed if elapsed else 0,
+    }
+    if profile:
+        result["profile"] = merge_summaries([chunk_result["profile"] for chunk_result in results])
+    return result
+
+# writes the profile of a render next to the movie, as movie.mp4.profile.txt
+def write_profile_report(result: dict) -> str:
+    report_path = result["output"] + ".profile.txt"
+    Path(report_path).write_text(format_report(result["profile"]) + "\n")
+    return report_path
+
+def emit(**message):
+    print(json.dumps(message), flush=True)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render PASOS scene files without the editor.")
+    parser.add_argument("scenes", nargs="+", help="scene files (.json or .pasosb)")
+    parser.add_argument("-o", "--output", required=True, help="movie file, or a directory when rendering several scenes")
+    parser.add_argument("-r", "--resolution", type=parse_resolution, help="WIDTHxHEIGHT, e.g. 1920x1080")
+    parser.add_argument("--fps", type=float, help="frame rate")
+    parser.add_argument("--frames", type=parse_frame_range, help="frame range FIRST:LAST (LAST excluded, both optional)")
+    parser.add_argument("--format", default="mp4", help="movie extension used when --output is a directory")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="number of processes rendering chunks of the scene")
+    parser.add_argument("--profile", action="store_true", help="time every phase of the frames and write a report next to each movie")
+    parser.add_argument("--tabulated-easings", action="store_true", help="sample every easing once and interpolate it (see rate_functions.py)")
+    parser.add_argument("--point-arena", action="store_true", help="keep the points of all the mobs in one buffer and transform them together (see point_arena.py)")
+    args = parser.parse_args(argv)
+
+    from manim import config
+    if args.resolution:
+        config.pixel_width, config.pixel_height = args.resolution
+    if args.fps:
+        config.frame_rate = args.fps
+
+    output = Path(args.output)
+    if len(args.scenes) > 1:
+        output.mkdir(parents=True, exist_ok=True)
+
+    failed = False
+    for scene_path in args.scenes:
+        movie_path = output / (Path(scene_path).stem + "." + args.format) if len(args.scenes) > 1 else output
+        emit(event="start", scene=scene_path, output=str(movie_path))
+        try:
+            progress = lambda done, total: emit(event="progress", scene=scene_path, frame=done, total=total)
+            if args.workers > 1:
+                result = render_scene_parallel(load_scene_file(scene_path), str(movie_path), args.workers, args.frames, progress, args.profile, args.tabulated_easings, args.point_arena)
+            else:
+                result = render_scene(load_scene_file(scene_path), str(movie_path), args.frames, progress, args.profile, args.tabulated_easings, args.point_arena)
+            if args.profile:
+                result["profile_report"] = write_profile_report(result)
+        except Exception as e:
+            emit(event="error", scene=scene_path, error=f"{type(e).__name__}: {e}")
+            failed = True
+            continue
+        emit(event="done", scene=scene_path, **result)
+    return int(failed)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# append-only journal of the edits made to a scene since it was last saved, so they can be recovered after a crash.
+# the journal of "scene.json" is "scene.json.journal", it's a json lines file:
+#   {"base": [size, mtime_ns]}           the scene file the edits apply to (recovery is skipped if it changed)
+#   {"row": 3, "events": [[...], ...]}   the whole content of a row after it was edited
+#   {"duration": 12.5}
+# later records replace earlier ones. when the journal grows past COMPACT_SIZE the editor saves the scene in the background
+# (autosave), which empties it, or if autosave is off the journal is compacted by keeping only the last record of every row.
+# rows are recorded instead of single events because moving an event can change its neighbors' limits, and rows are short
+import json
+import os
+import threading
+
+from .timeline_model import PEvent
+
+JOURNAL_SUFFIX = ".journal"
+COMPACT_SIZE = 1024 * 1024 # the journal is saved into the scene file or compacted when it grows past this many bytes
+
+def get_journal_path(scene_path: str) -> str:
+    return scene_path + JOURNAL_SUFFIX
+
+# identifies the version of the scene file on disk, None if it doesn't exist
+def get_file_stamp(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+class EditJournal:
+    def __init__(self, scene_path: str):
+        self.scene_path = scene_path
+        self.path = get_journal_path(scene_path)
+        self.lock = threading.Lock() # appends happen in the qt thread, compaction in its own thread
+        self.latest = {} # ("row", idx) or ("duration",) -> last json line recorded for it
+        self.file = None # opened when the first edit is recorded
+        self.size = 0
+        self.compacting = False
+
+    def record_rows(self, timeline, row_indexes):
+        self.append({("row", row_idx): json.dumps({"row": row_idx, "events": [p_event.to_list() for p_event in timeline[row_idx]]}) for row_idx in row_indexes})
+
+    def record_duration(self, duration: float):
+        self.append({("duration",): json.dumps({"duration": duration})})
+
+    # continues a journal that was recovered, its records are rewritten on top of the current scene file
+    def resume(self, records: list):
+        with self.lock:
+            for record in records:
+                self.latest[("row", record["row"]) if "row" in record else ("duration",)] = json.dumps(record)
+            self.rewrite(get_file_stamp(self.scene_path))
+
+    def append(self, entries: dict):
+        if not entries:
+            return
+        with self.lock:
+            self.latest.update(entries)
+            if self.file == None:
+                self.file = open(self.path, "w")
+                self.size = self.file.write(json.dumps({"base": get_file_stamp(self.scene_path)}) + "\n")
+            self.size += self.file.write("\n".join(entries.values()) + "\n")
+            self.file.flush() # only reaches the os, a crash of the editor doesn't lose it and edits don't wait for the disk
+
+    def needs_compaction(self) -> bool:
+        return self.size > COMPACT_SIZE and not self.compacting
+
+    def start_compaction(self):
+        self.compacting = True
+        threading.Thread(target=self.compact, daemon=True).start()
+
+    # whether there are edits that the scene file doesn't have
+    def has_unsaved_records(self) -> bool:
+        with self.lock:
+            return bool(self.latest)
+
+    # rewrites the journal with only the last record of every row
+    def compact(self):
+        with self.lock:
+            self.rewrite(read_journal_base(self.path))
+            self.compacting = False
+
+    # must be called with the lock held
+    def rewrite(self, base):
+        if self.file != None:
+            self.file.close()
+            self.file = None
+        if not self.latest:
+            remove_file(self.path)
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            self.size = f.write(json.dumps({"base": base}) + "\n")
+            self.size += f.write("\n".join(self.latest.values()) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, "a")
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(self.latest)
+
+    # called after the scene was written to scene_path with the state the journal had at `snapshot`.
+    # records made while it was being saved are kept, now based on the new file
+    def mark_saved(self, snapshot: dict, scene_path: str):
+        with self.lock:
+            for key, line in snapshot.items():
+                if self.latest.get(key) == line:
+                    del self.latest[key]
+            if scene_path != self.scene_path: # save as
+                if self.file != None:
+                    self.file.close()
+                    self.file = None
+                remove_file(self.path)
+                self.scene_path = scene_path
+                self.path = get_journal_path(scene_path)
+            self.rewrite(get_file_stamp(self.scene_path))
+
+    # the edits are saved or discarded by the user
+    def close(self):
+        with self.lock:
+            if self.file != None:
+                self.file.close()
+                self.file = None
+            self.latest.clear()
+            remove_file(self.path)
+
+def remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def read_journal_base(path: str):
+    with open(path, "r") as f:
+        return json.loads(f.readline())["base"]
+
+# records of the journal of a scene file, None if there is no journal or the scene file changed after it was written
+def read_journal(scene_path: str):
+    path = get_journal_path(scene_path)
+    if not os.path.exists(path):
+        return None
+    records = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError: # the last line can be incomplete if the editor crashed while writing it
+                break
+    if not records or records[0].get("base") != get_file_stamp(scene_path):
+        return None
+    return records[1:]
+
+# applies the records of a journal to a scene dict (as returned by read_scene_file)
+def replay_journal(scene_dict: dict, records: list):
+    timeline = scene_dict["timeline"]
+    for record in records:
+        if "duration" in record:
+            scene_dict["duration"] = record["duration"]
+        elif "row" in record:
+            while len(timeline) <= record["row"]:
+                timeline.append([])
+            timeline[record["row"]] = [PEvent(*p_event) for p_event in record["events"]]
@@ -1,44 +1,86 @@
 from manim import *
 import numpy as np
-from .expression_evaluator import create_node_visitor, pasos_eval, EmptyVMobject
+import math
+from bisect import bisect_right
+from collections import OrderedDict
+from .expression_evaluator import create_node_visitor, pasos_eval, formula_uses_name, EmptyVMobject
+from .rate_functions import get_rate_function, check_timeline_rate_functions
+from .scene_file import loaded_rows
+from .timeline_model import get_track_property, get_track_mob_idx
+from .profiling import PROFILER, instrument
+from .point_arena import PointArena
+from time import perf_counter
 
-def get_angle_between_mobs(A: Mobject, B: Mobject) -> float:
-    if not (len(A.get_all_points()) and len(B.get_all_points())):
-        return 0
+# every mob keeps the points its sprite had right after become() (base points) and is drawn as
+#   position + scale * R(angle) @ base point
+# so a position/angle/scale change is one matrix product per submobject, instead of undoing the previous transform
+def get_transform_matrix(angle: float, scale: float) -> np.ndarray:
+    cos, sin = np.cos(angle), np.sin(angle)
+    return scale * np.array([[cos, -sin, 0], [sin, cos, 0], [0, 0, 1]])
 
-    A_fpp = A.get_all_points()[0] - A.get_center()
-    B_fpp = B.get_all_points()[0] - B.get_center()
-    # fpp stands for "first point position"
+# (submobject, base points) of every submobject with points. the arrays aren't copied, apply_transform always replaces
+# submob.points with a new array right after, so the base points can't be modified in place by anything else
+def get_base_points(mob: Mobject) -> list:
+    return [(submob, submob.points) for submob in mob.family_members_with_points()]
 
-    return np.arctan2(A_fpp[1], A_fpp[0]) - np.arctan2(B_fpp[1], B_fpp[0])
-
-def get_ratio_between_mobs(A: Mobject, B: Mobject) -> float:
-    if not (len(A.get_all_points()) and len(B.get_all_points())):
-        return 1
-
-    A_fpp = A.get_all_points()[0] - A.get_center()
-    B_fpp = B.get_all_points()[0] - B.get_center()
-    # fpp stands for "first point position"
-
-    return np.linalg.norm(A_fpp) / (np.linalg.norm(B_fpp) or 1)
+def apply_transform(base_points: list, position, angle: float, scale: float):
+    matrix = get_transform_matrix(angle, scale).T
+    for submob, points in base_points:
+        submob.points = points @ matrix + position
 
 def become_mob_or_empty(mob: Mobject, new_thing: Mobject):
     if isinstance(new_thing, EmptyVMobject):
         new_thing = mob.copy().set_opacity(0)
     mob.become(new_thing)
 
-# this animation extracts a specific frame (alpha) of an animation (anim)
-def get_animation_frame(anim: Animation, alpha: float) -> Mobject:
-    anim.begin()
-    anim.interpolate(alpha)
-    partial = anim.mobject.copy()
-    anim.finish()
-    return partial
+def get_points_nbytes(mob: Mobject) -> int:
+    return sum(submob.points.nbytes for submob in mob.get_family())
+
+# building sprites (specially MathTex and Text, which call LaTeX/Pango) is slow, so each sprite formula is built once and
+# copies of that prototype are returned. formulas that read PMOBS depend on the scene state, so they're never cached
+class SpriteCache:
+    def __init__(self, max_bytes=64 * 2**20):
+        self.max_bytes = max_bytes
+        self.sprites = OrderedDict() # formula -> (prototype, nbytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, expr, node_visitor):
+        if expr in self.sprites:
+            self.hits += 1
+            self.sprites.move_to_end(expr)
+            return self.sprites[expr][0].copy()
+        sprite = pasos_eval(expr, node_visitor)
+        if formula_uses_name(expr, "PMOBS") or not isinstance(sprite, Mobject):
+            return sprite
+        self.misses += 1
+        nbytes = get_points_nbytes(sprite)
+        if nbytes <= self.max_bytes:
+            self.sprites[expr] = (sprite, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self.nbytes -= self.sprites.popitem(last=False)[1][1]
+        return sprite.copy()
+
+    def clear(self):
+        self.sprites.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.sprites), "nbytes": self.nbytes, "max_bytes": self.max_bytes}
+
+SPRITE_CACHE = SpriteCache()
+SPRITE_PREFIXES = ("C: ", "W: ", "T: ", "S: ")
 
 def evaluate_formula(f: str, init_value, alpha: float, node_visitor):
     if f[:3] == "E: ": # E stands for "Expression evaluation"
         return pasos_eval("lambda t: " + f[3:], node_visitor)(alpha)
     elif alpha == 1:
+        if f[:3] in SPRITE_PREFIXES:
+            return SPRITE_CACHE.get(f[3:], node_visitor)
         return pasos_eval(f[3:], node_visitor)
     if f[:3] == "L: ": # L stands for "Linear interpolation"
         end_value = pasos_eval(f[3:], node_visitor)
@@ -48,26 +90,172 @@ def evaluate_formula(f: str, init_value, alpha: float, node_visitor):
     if f[:3] == "G: ": # G stands for "Geometric interpolation"
         end_value = pasos_eval(f[3:], node_visitor)
         return init_value * (end_value/init_value)**alpha
+    if f[:3] in SPRITE_PREFIXES:
+        return AnimationPlan(f, init_value, node_visitor).frame(alpha)
+
+# returns the animations that draw a sprite transition, and whether their frames must be grouped in a VGroup
+def create_sprite_animations(f: str, init_value: Mobject, end_value: Mobject):
     if f[:3] == "C: ": # C stands for "Creation"
-        end_value = pasos_eval(f[3:], node_visitor)
         if isinstance(init_value, EmptyVMobject):
-            return get_animation_frame(Create(end_value, rate_func=linear), alpha)
+            return [Create(end_value, rate_func=linear)], False
         if isinstance(end_value, EmptyVMobject):
-            return get_animation_frame(Uncreate(init_value.copy(), rate_func=linear), alpha)
-        return VGroup(get_animation_frame(Create(end_value, rate_func=linear), alpha), get_animation_frame(Uncreate(init_value.copy(), rate_func=linear), alpha))
+            return [Uncreate(init_value.copy(), rate_func=linear)], False
+        return [Create(end_value, rate_func=linear), Uncreate(init_value.copy(), rate_func=linear)], True
     if f[:3] == "W: ": # W stands for "Writing"
-        end_value = pasos_eval(f[3:], node_visitor)
         if isinstance(init_value, EmptyVMobject):
-            return get_animation_frame(Write(end_value, rate_func=linear), alpha)
+            return [Write(end_value, rate_func=linear)], False
         if isinstance(end_value, EmptyVMobject):
-            return get_animation_frame(Unwrite(init_value, rate_func=linear), alpha)
-        return VGroup(get_animation_frame(Write(end_value, rate_func=linear), alpha), get_animation_frame(Unwrite(init_value.copy(), rate_func=linear), alpha))
+            return [Unwrite(init_value.copy(), rate_func=linear)], False
+        return [Write(end_value, rate_func=linear), Unwrite(init_value.copy(), rate_func=linear)], True
     if f[:3] == "T: ": # T stands for "Transformation"
-        end_value = pasos_eval(f[3:], node_visitor)
-        return get_animation_frame(Transform(init_value.copy(), end_value, rate_func=linear), alpha)
+        return [Transform(init_value.copy(), end_value, rate_func=linear)], False
     if f[:3] == "S: ": # S stands for "Submobject transformation" (btw i'm not sure if i'll keep this as a default prefix)
-        end_value = pasos_eval(f[3:], node_visitor)
-        return VGroup(*[get_animation_frame(Transform(submob, end_value, rate_func=linear), alpha) for submob in init_value.copy()])
+        return [Transform(submob, end_value, rate_func=linear) for submob in init_value.copy()], True
+
+# the animations of a sprite event are created and begun (which aligns the points of the start and target mobjects)
+# only once, then every frame of the event just interpolates them to its alpha
+class AnimationPlan:
+    def __init__(self, f: str, init_value: Mobject, node_visitor):
+        self.init_value = init_value
+        self.animations, self.grouped = create_sprite_animations(f, init_value, SPRITE_CACHE.get(f[3:], node_visitor))
+        for anim in self.animations:
+            anim.begin()
+
+    # this extracts a specific frame (alpha) of the animations
+    def frame(self, alpha: float) -> Mobject:
+        partials = []
+        for anim in self.animations:
+            anim.interpolate(alpha)
+            partials.append(anim.mobject.copy())
+        return VGroup(*partials) if self.grouped else partials[0]
+
+# tries to evaluate an E: function on the whole alpha array at once (t becomes a column, so vectors broadcast into rows).
+# formulas that don't broadcast correctly (min, max, norm, int...) are detected by comparing with scalar calls at the
+# ends and in the middle (a formula can be right at both ends, e.g. with there_and_back) and evaluated element-wise instead
+def evaluate_expression_batch(function, alphas: np.ndarray) -> np.ndarray:
+    sample_indexes = sorted({0, len(alphas) // 2, len(alphas) - 1})
+    samples = [np.asarray(function(alphas[k]), dtype=float) for k in sample_indexes]
+    try:
+        values = np.asarray(function(alphas[:, np.newaxis]), dtype=float)
+        if values.ndim < 2:
+            values = np.broadcast_to(values, (len(alphas),) + samples[0].shape) # the formula doesn't depend on t
+        elif values.shape[1] == 1:
+            values = values.reshape((len(alphas),) + values.shape[2:])
+        if values.shape[1:] == samples[0].shape and all(np.allclose(values[k], sample) for k, sample in zip(sample_indexes, samples)):
+            return np.array(values)
+    except Exception:
+        pass
+    return np.array([function(alpha) for alpha in alphas], dtype=float)
+
+# batch version of evaluate_formula for numeric timelines (position, angle, scale and opacity).
+# alphas is an array with the (already eased) alpha of every frame, the result has one row per alpha
+def evaluate_formula_batch(f: str, init_value, alphas, node_visitor) -> np.ndarray:
+    alphas = np.asarray(alphas, dtype=float)
+    if len(alphas) == 0:
+        return np.array([])
+    if f[:3] == "E: ":
+        return evaluate_expression_batch(pasos_eval("lambda t: " + f[3:], node_visitor), alphas)
+    if f[:3] not in ("L: ", "G: "):
+        raise ValueError(f"Formula '{f}' can't be evaluated in batch mode (only E:, L: and G: formulas can)")
+
+    end_value = np.asarray(pasos_eval(f[3:], node_visitor), dtype=float)
+    init_value = np.asarray(init_value, dtype=float)
+    column = alphas.reshape((-1,) + (1,) * max(end_value.ndim, init_value.ndim))
+    if f[:3] == "L: ":
+        values = init_value + (end_value - init_value) * column
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = init_value * (end_value/init_value)**column
+    values[alphas == 1] = end_value # same as evaluate_formula, where alpha = 1 returns the end value directly
+    return values
+
+BATCH_PREFIXES = ("E: ", "L: ", "G: ")
+
+def values_differ(old_value, new_value) -> bool:
+    if old_value is new_value:
+        return False
+    if isinstance(old_value, Mobject) or isinstance(new_value, Mobject):
+        return True # sprites are compared by identity, a new sprite always means a rebuild
+    return not np.array_equal(old_value, new_value)
+
+def get_default_value(row_idx: int):
+    return [ORIGIN, 0, 1, 1, PASOS.empty_mobject][row_idx%5] # the empty sprite is never modified, so it can be shared
+
+# keyframes of a single timeline row: sorted start/end times and the resolved end value of each event.
+# end values are computed lazily (sprites can be expensive) and kept until the row is edited. the end values of an event
+# that reads PMOBS, and of every event after it, depend on the other mobs, so they're computed again every time
+class TrackKeyframes:
+    def __init__(self, row_idx: int, event_list: list, node_visitor, tabulated_rate_functions: bool = False):
+        self.row_idx = row_idx
+        self.event_list = event_list
+        self.node_visitor = node_visitor
+        self.starts = [e.start for e in event_list]
+        self.ends = [e.start + e.duration for e in event_list]
+        self.rate_funcs = [get_rate_function(e.easing, tabulated_rate_functions) for e in event_list]
+        self.end_values = [None] * len(event_list)
+        self.resolved = [False] * len(event_list)
+        uses_pmobs = [formula_uses_name(e.formula[3:], "PMOBS") for e in event_list]
+        self.first_dynamic = uses_pmobs.index(True) if True in uses_pmobs else len(event_list)
+        self.plan = None
+        self.plan_idx = None
+        # E:/L:/G: events that don't read PMOBS only depend on their alpha, so exports evaluate them for all the frames
+        # of the event at once (see frame_value)
+        self.batchable = [e.formula[:3] in BATCH_PREFIXES and not uses_pmobs[k] for k, e in enumerate(event_list)]
+        self.batch_idx = None
+        self.batch_init_value = None
+        self.batch_first_frame = 0
+        self.batch_values = None
+
+    def is_outdated(self, event_list: list) -> bool:
+        return event_list is not self.event_list or len(event_list) != len(self.ends)
+
+    # index of the event that controls the row at this time (the same one the old step-by-step walk would find)
+    def index_at(self, time: float) -> int:
+        return min(bisect_right(self.ends, time), len(self.ends) - 1)
+
+    def end_value(self, idx: int):
+        if idx >= self.first_dynamic:
+            value = self.end_value(self.first_dynamic - 1) if self.first_dynamic > 0 else get_default_value(self.row_idx)
+            for k in range(self.first_dynamic, idx + 1):
+                value = evaluate_formula(self.event_list[k].formula, value, 1, self.node_visitor)
+            return value
+        if not self.resolved[idx]:
+            first = idx
+            while first > 0 and not self.resolved[first-1]:
+                first -= 1
+            value = self.end_values[first-1] if first > 0 else get_default_value(self.row_idx)
+            for k in range(first, idx + 1):
+                value = evaluate_formula(self.event_list[k].formula, value, 1, self.node_visitor)
+                self.end_values[k] = value
+                self.resolved[k] = True
+        return self.end_values[idx]
+
+    def init_value(self, idx: int):
+        return self.end_value(idx - 1) if idx > 0 else get_default_value(self.row_idx)
+
+    # value of a batchable event at the frame shown at `time`. the values from that frame to the end of the event are
+    # computed with evaluate_formula_batch the first time, and only the last event's are kept (exports go forward)
+    def frame_value(self, idx: int, init_value, time: float, frame_rate: float):
+        frame = round(time * frame_rate)
+        k = frame - self.batch_first_frame
+        if self.batch_idx != idx or self.batch_init_value is not init_value or not 0 <= k < len(self.batch_values):
+            start, duration = self.starts[idx], self.event_list[idx].duration
+            last_frame = max(math.ceil(self.ends[idx] * frame_rate), frame)
+            rate_func = self.rate_funcs[idx]
+            alphas = [rate_func(min(max(n / frame_rate - start, 0) / duration, 1)) for n in range(frame, last_frame + 1)]
+            self.batch_values = evaluate_formula_batch(self.event_list[idx].formula, init_value, alphas, self.node_visitor)
+            self.batch_idx = idx
+            self.batch_init_value = init_value
+            self.batch_first_frame = frame
+            k = 0
+        return self.batch_values[k]
+
+    # only the plan of the last event that was played is kept, since events are usually visited one after another
+    def animation_plan(self, idx: int, init_value: Mobject) -> AnimationPlan:
+        if self.plan_idx != idx or self.plan.init_value is not init_value:
+            self.plan = AnimationPlan(self.event_list[idx].formula, init_value, self.node_visitor)
+            self.plan_idx = idx
+        return self.plan
 
 # this animation is basically what makes PASOS work in render_mode, it calls update_mobs() at every frame
 class always_update_mobs(Animation):
@@ -81,6 +269,10 @@ class always_update_mobs(Animation):
             self.scene.remove(self.scene.pmobs[i])
         self.scene.update_mobs()
 
+# the same number of frames manim renders for a scene of this duration
+def get_n_of_frames(duration: float, frame_rate: float) -> int:
+    return len(np.arange(0, duration, 1 / frame_rate))
+
 class PASOS(MovingCameraScene):
     empty_mobject = EmptyVMobject()
     edtv = {} # editor variables, this is shared between pygame, pyqt's main window and its widgets
@@ -89,8 +281,16 @@ class PASOS(MovingCameraScene):
         super().__init__(*args, **kwargs)
         self.nv = create_node_visitor(self)
         self.render_mode = render_mode
+        self.profiler = PROFILER # exports get their own (see headless.render_scene)
+        instrument(self.renderer, "update_frame", "rasterization", lambda: self.profiler, ends_frame=True)
 
         self.duration = 1 # i have to create the duration variable here cuz Scene already has a duration variable lol
+        self.frame_range = None # (first_frame, last_frame) rendered in render_mode, None renders the whole scene
+        self.time_offset = 0 # scene time of the first rendered frame
+        self.timeline_version = 0 # changes whenever the timeline is edited or replaced, so cached frames can be discarded
+        self.edited_rows = set() # rows edited since the editor last wrote them to the journal
+        self.tabulated_rate_functions = False # if True, easings are sampled once and linearly interpolated (see rate_functions.py)
+        self.use_point_arena = False # if True, the points of all the mobs live in one buffer (see point_arena.py)
         self.timeline = []
         self.invisible_objects = []
         
@@ -98,68 +298,179 @@ class PASOS(MovingCameraScene):
         self.update_visible_mobs()
 
         if self.render_mode:
-            update = [self.duration, self.timeline, self.invisible_objects]
-            self.play(always_update_mobs(self, update), run_time=self.duration)
+            update = [self.duration, self.timeline, self.invisible_objects, self.frame_range]
+            if self.frame_range == None:
+                self.play(always_update_mobs(self, update), run_time=self.duration)
+            else:
+                # manim renders the frames at 0, 1/fps, 2/fps... < run_time, so half a frame is removed from the end
+                # to get exactly last_frame - first_frame frames
+                first_frame, last_frame = self.frame_range
+                self.time_offset = first_frame / self.camera.frame_rate
+                self.play(always_update_mobs(self, update), run_time=(last_frame - first_frame - 0.5) / self.camera.frame_rate)
 
     def update_visible_mobs(self):
+        # rows of binary scenes are checked when the file is read and saved sorted, so only the loaded ones are checked here
+        check_timeline_rate_functions(loaded_rows(self.timeline))
+        for event_list in loaded_rows(self.timeline): # the editor and the keyframes expect the rows sorted by start
+            event_list.sort(key=lambda p_event: p_event.start)
+        self.timeline_version += 1
         self.pmobs = Group(*[EmptyVMobject() for _ in range(len(self.timeline)//5)])
         self.mob_data = [{"position": ORIGIN, "angle": 0, "scale": 1, "opacity": 1, "sprite": EmptyVMobject()} for _ in self.pmobs]
+        self.base_points = [[] for _ in self.pmobs] # see get_base_points
+        self.point_arena = PointArena(len(self.pmobs)) if self.use_point_arena else None
         self.current_indexes = [0] * 5 * len(self.mob_data)
         self.into_event = [False] * 5 * len(self.mob_data)
         self.init_values = sum([[ORIGIN, 0, 1, 1, EmptyVMobject()] for _ in self.mob_data], [])
+        self.tracks = [None] * len(self.timeline) # TrackKeyframes of each row, None means it has to be rebuilt
+        self.init_value_sources = [None] * len(self.timeline) # (track, index) that init_values[i] was taken from
 
         self.clear()
         for i in self.pmobs:
             if not i in self.invisible_objects:
                 self.add(i)
 
+    # must be called whenever an event of self.timeline[row_idx] is edited, so its keyframes are rebuilt
+    def invalidate_track(self, row_idx: int):
+        if 0 <= row_idx < len(self.tracks):
+            self.tracks[row_idx] = None
+        self.edited_rows.add(row_idx)
+        self.timeline_version += 1
+
+    # the keyframes of every row keep their rate functions, so they're all rebuilt
+    def set_tabulated_rate_functions(self, tabulated: bool):
+        self.tabulated_rate_functions = tabulated
+        self.tracks = [None] * len(self.tracks)
+        self.timeline_version += 1
+
+    # the new arena is built from the points of the mobs the next time they're rebuilt
+    def set_point_arena(self, enabled: bool):
+        self.use_point_arena = enabled
+        self.point_arena = PointArena(len(self.pmobs)) if enabled else None
+        self.timeline_version += 1
+
+    def get_track(self, row_idx: int) -> TrackKeyframes:
+        track = self.tracks[row_idx]
+        if track == None or track.is_outdated(self.timeline[row_idx]):
+            track = TrackKeyframes(row_idx, self.timeline[row_idx], self.nv, self.tabulated_rate_functions)
+            self.tracks[row_idx] = track
+        return track
+
     def update_mobs(self):
+        dirty_mobs = {} # mob index -> whether it needs become() or only the position/angle/scale update
+        prof = self.profiler if self.profiler.enabled else None
         for i, event_list in enumerate(self.timeline):
             if not event_list:
                 continue
 
-            time = self.time if self.render_mode else self.edtv["time"]
-
-            # update the current index
-            idx = self.current_indexes[i]
-            update_init_values = False
-            while idx + 1 < len(event_list) and time >= event_list[idx][0] + event_list[idx][1]:
-                idx += 1
-                update_init_values = True
-            while idx > 0 and time < event_list[idx-1][0] + event_list[idx-1][1]:
-                idx -= 1
-                update_init_values = True
+            if prof:
+                start = perf_counter()
+            time = self.time + self.time_offset if self.render_mode else self.edtv["time"]
+
+            # update the current index (binary search, so seeking to any time costs the same)
+            track = self.get_track(i)
+            idx = track.index_at(time)
             self.current_indexes[i] = idx
-            
-            if update_init_values:
-                if idx == 0:
-                    self.init_values[i] = [ORIGIN, 0, 1, 1, EmptyVMobject()][i%5]
-                else:
-                    self.init_values[i] = evaluate_formula(event_list[idx-1][3], self.init_values[i], 1, self.nv)
-                self.into_event[i] = True
+            if dirty_mobs and idx >= track.first_dynamic:
+                # the value reads PMOBS, so the mobs changed by the previous rows are rebuilt first (this is what
+                # rebuilding every mob as soon as its row changed did)
+                self.rebuild_dirty_mobs(dirty_mobs)
 
-            e_start, e_dur, e_rate_func, e_formula = event_list[idx] # e stands for event, dur stands for duration
-            if time >= e_start: # update mob data
+            if self.init_value_sources[i] != (track, idx):
+                self.init_value_sources[i] = (track, idx)
+                self.init_values[i] = track.init_value(idx)
+                self.into_event[i] = True
+            elif idx > track.first_dynamic: # the init value reads PMOBS, so it can change at every frame
+                self.init_values[i] = track.init_value(idx)
                 self.into_event[i] = True
-                self.mob_data[i//5][["position", "angle", "scale", "opacity", "sprite"][i%5]] = evaluate_formula(e_formula, self.init_values[i], eval(e_rate_func)((time-e_start)/e_dur), self.nv)
 
-            if not self.into_event[i]:
+            p_event = event_list[idx]
+            e_start, e_dur, e_formula = p_event.start, p_event.duration, p_event.formula # e stands for event, dur stands for duration
+            if prof:
+                start = prof.add("keyframes", start)
+            if time >= e_start: # update mob data
+                alpha = track.rate_funcs[idx](min((time-e_start)/e_dur, 1))
+                if alpha == 1 and time >= track.ends[idx]:
+                    # the event is over, so it holds the end value kept by the track. sprites are compared by identity
+                    # (see values_differ) and every evaluation gives a new copy, so without this a finished sprite would
+                    # rebuild its mob (and build the point arena again) at every frame
+                    new_value = track.end_value(idx)
+                    if prof:
+                        prof.add("formulas", start, track=i)
+                elif e_formula[:3] in SPRITE_PREFIXES and alpha != 1:
+                    new_value = track.animation_plan(idx, self.init_values[i]).frame(alpha)
+                    if prof:
+                        prof.add("interpolation", start, track=i)
+                elif self.render_mode and track.batchable[idx]:
+                    new_value = track.frame_value(idx, self.init_values[i], time, self.camera.frame_rate)
+                    if prof:
+                        prof.add("formulas", start, track=i)
+                else:
+                    new_value = evaluate_formula(e_formula, self.init_values[i], alpha, self.nv)
+                    if prof:
+                        prof.add("formulas", start, track=i)
+            elif self.into_event[i]:
+                new_value = self.init_values[i]
+            else:
                 continue
+            self.into_event[i] = time >= e_start
 
-            if time < e_start:
-                self.mob_data[i//5][["position", "angle", "scale", "opacity", "sprite"][i%5]] = self.init_values[i]
-                self.into_event[i] = False
-
-            mob = self.pmobs[i//5]
-            mob_props = self.mob_data[i//5] # properties of the mobject
-            event_type = i%5
-            center = mob_props["position"]
-            if event_type >= 3: # sprite or opacity
-                become_mob_or_empty(mob, mob_props["sprite"])
-                mob.shift(center).rotate(mob_props["angle"], about_point=center).scale(mob_props["scale"], about_point=center).fade(1 - mob_props["opacity"])
-            #elif event_type == 3: # only opacity
-            #    mob.fade(1 - mob_props["opacity"])
-            else:
-                mob.move_to(mob_props["sprite"].get_center() + center)
-                mob.rotate(mob_props["angle"] + get_angle_between_mobs(mob_props["sprite"], mob), about_point=center)
-                mob.scale(mob_props["scale"] * get_ratio_between_mobs(mob_props["sprite"], mob), about_point=center)
\ No newline at end of file
+            # the mobject is only rebuilt if one of its tracks changed value since the last frame
+            mob_idx, track_property = get_track_mob_idx(i), get_track_property(i)
+            mob_props = self.mob_data[mob_idx] # properties of the mobject
+            if values_differ(mob_props[track_property], new_value):
+                mob_props[track_property] = new_value
+                dirty_mobs[mob_idx] = dirty_mobs.get(mob_idx, False) or track_property in ("opacity", "sprite") # these need become()
+
+        self.rebuild_dirty_mobs(dirty_mobs)
+
+    def rebuild_dirty_mobs(self, dirty_mobs: dict):
+        if self.point_arena == None:
+            for mob_idx, needs_become in dirty_mobs.items():
+                self.rebuild_mob(mob_idx, needs_become)
+        else:
+            self.rebuild_mobs_in_arena(dirty_mobs)
+        dirty_mobs.clear()
+
+    def rebuild_mob(self, mob_idx: int, needs_become: bool):
+        prof = self.profiler if self.profiler.enabled else None
+        if prof:
+            mob_start = start = perf_counter()
+        if needs_become: # sprite or opacity
+            self.become_sprite(mob_idx)
+            if prof:
+                start = prof.add("become", start)
+        mob_props = self.mob_data[mob_idx]
+        apply_transform(self.base_points[mob_idx], mob_props["position"], mob_props["angle"], mob_props["scale"])
+        if prof:
+            prof.add("transforms", start)
+            prof.add_mob(mob_idx, mob_start)
+
+    # the same as rebuild_mob for all the dirty mobs, with the transforms batched over the point arena
+    def rebuild_mobs_in_arena(self, dirty_mobs: dict):
+        prof = self.profiler if self.profiler.enabled else None
+        if prof:
+            start = perf_counter()
+        for mob_idx, needs_become in dirty_mobs.items():
+            if needs_become:
+                self.become_sprite(mob_idx)
+                # become() replaced the points of the mob, they aren't views of the arena anymore
+                if self.point_arena.valid and not self.point_arena.replace(mob_idx, self.base_points[mob_idx]):
+                    self.point_arena.valid = False
+        if prof:
+            start = prof.add("become", start)
+        if self.point_arena.valid:
+            self.point_arena.transform(list(dirty_mobs), self.mob_data)
+        else:
+            self.point_arena.build(self.base_points)
+            self.point_arena.transform(list(range(len(self.mob_data))), self.mob_data)
+        if prof:
+            prof.add("transforms", start)
+
+    # replaces the mob with its sprite (with the opacity of the mob), which gives the mob new base points
+    def become_sprite(self, mob_idx: int):
+        mob = self.pmobs[mob_idx]
+        mob_props = self.mob_data[mob_idx]
+        become_mob_or_empty(mob, mob_props["sprite"])
+        if not isinstance(mob_props["sprite"], EmptyVMobject): # an empty sprite only hides the mob, its base points stay
+            self.base_points[mob_idx] = get_base_points(mob)
+        mob.fade(1 - mob_props["opacity"])
@@ -0,0 +1,89 @@
+# optional layout of the points of every PMOB in one contiguous buffer (see PASOS.use_point_arena).
+# every submobject's points are a view into `points`, and its base points (see pasos.get_base_points) a view into `base`,
+# so the position/angle/scale of all the dirty mobs of a frame are applied with a few numpy operations over the whole
+# buffer instead of one small operation per submobject. it pays off with thousands of small mobs (particles made of Dots),
+# with a few big ones the python loop it replaces is already cheap.
+# become() gives a mob new point arrays. if the mob has as many points as before they're copied into its slice (replace),
+# otherwise the arena has to be built again (build is O(total points))
+import numpy as np
+
+class PointArena:
+    def __init__(self, n_of_mobs: int):
+        self.base = np.zeros((0, 3))
+        self.points = np.zeros((0, 3))
+        self.owners = np.zeros(0, dtype=int) # mob index of every point
+        self.counts = np.zeros(n_of_mobs, dtype=int) # points of every mob, which are contiguous
+        self.starts = np.zeros(n_of_mobs, dtype=int) # index of the first point of every mob
+        # transform of every mob: position, and scale * cos(angle), scale * sin(angle), scale
+        self.positions = np.zeros((n_of_mobs, 3))
+        self.cos = np.ones(n_of_mobs)
+        self.sin = np.zeros(n_of_mobs)
+        self.scales = np.ones(n_of_mobs)
+        self.valid = False # False when the points of some mob were replaced and the arena has to be built again
+
+    # copies the base points of every mob into the arena and points every submobject (and base_points) to its views
+    def build(self, base_points: list):
+        submobs = [(mob_idx, k, submob, points) for mob_idx, mob_base_points in enumerate(base_points) for k, (submob, points) in enumerate(mob_base_points)]
+        if submobs:
+            self.base = np.concatenate([points for _, _, _, points in submobs], dtype=float)
+        else:
+            self.base = np.zeros((0, 3))
+        self.points = self.base.copy()
+        self.counts = np.bincount([mob_idx for mob_idx, _, _, _ in submobs], [len(points) for _, _, _, points in submobs], len(base_points)).astype(int)
+        self.owners = np.repeat(np.arange(len(base_points)), self.counts)
+        self.starts = np.cumsum(self.counts) - self.counts
+        start = 0
+        for mob_idx, k, submob, points in submobs:
+            end = start + len(points)
+            base_points[mob_idx][k] = (submob, self.base[start:end])
+            submob.points = self.points[start:end]
+            start = end
+        self.valid = True
+
+    # copies the new base points of one mob into its slice, returns False (and changes nothing) if the number of points
+    # changed, then the arena has to be built again
+    def replace(self, mob_idx: int, mob_base_points: list) -> bool:
+        if sum(len(points) for _, points in mob_base_points) != self.counts[mob_idx]:
+            return False
+        start = self.starts[mob_idx]
+        for k, (submob, points) in enumerate(mob_base_points):
+            end = start + len(points)
+            self.base[start:end] = points
+            mob_base_points[k] = (submob, self.base[start:end])
+            submob.points = self.points[start:end]
+            start = end
+        return True
+
+    # applies the transform of the mobs in mob_indexes (taken from their mob_data) to their points, the same way
+    # pasos.apply_transform does: position + scale * R(angle) @ base point
+    def transform(self, mob_indexes: list, mob_data: list):
+        if not mob_indexes:
+            return
+        positions = [mob_data[mob_idx]["position"] for mob_idx in mob_indexes]
+        angles = np.array([mob_data[mob_idx]["angle"] for mob_idx in mob_indexes], dtype=float)
+        scales = np.array([mob_data[mob_idx]["scale"] for mob_idx in mob_indexes], dtype=float)
+        mob_indexes = np.array(mob_indexes, dtype=int)
+        self.positions[mob_indexes] = positions
+        self.cos[mob_indexes] = scales * np.cos(angles)
+        self.sin[mob_indexes] = scales * np.sin(angles)
+        self.scales[mob_indexes] = scales
+
+        if len(mob_indexes) == len(self.positions): # every point, the transforms are repeated instead of gathered
+            per_point = lambda values: np.repeat(values, self.counts, axis=0)
+            base, transformed = self.base, self.points
+        else:
+            dirty = np.zeros(len(self.positions), dtype=bool)
+            dirty[mob_indexes] = True
+            selected = np.flatnonzero(dirty[self.owners])
+            owners = self.owners[selected]
+            per_point = lambda values: values[owners]
+            base = self.base[selected]
+            transformed = np.empty_like(base)
+        cos, sin = per_point(self.cos), per_point(self.sin)
+        x, y = base[:, 0], base[:, 1]
+        transformed[:, 0] = cos * x - sin * y
+        transformed[:, 1] = sin * x + cos * y
+        transformed[:, 2] = per_point(self.scales) * base[:, 2]
+        transformed += per_point(self.positions)
+        if transformed is not self.points:
+            self.points[selected] = transformed # in place, the submobjects keep their views
@@ -0,0 +1,98 @@
+# renders preview frames ahead of the playhead in other processes, so playback doesn't depend on how fast a single
+# frame can be rendered. this works because a PASOS frame can be computed from the timeline and the time alone
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .scene_file import copy_scene_dict
+
+worker_scene = None # the PASOS scene of a worker process
+worker_version = None # timeline version of worker_scene
+
+def init_worker(render_config: dict):
+    import logging
+    logging.getLogger("manim").setLevel(logging.ERROR)
+    from manim import config
+    for key, value in render_config.items():
+        config[key] = value
+
+# the scene is written to scene_path once per version and every worker reads it the first time it renders a frame of
+# that version, so requests only send (version, path, time) instead of the whole timeline
+def render_preview_frame(version: int, scene_path: str, time: float) -> np.ndarray:
+    global worker_scene, worker_version
+    from .pasos import PASOS
+    if worker_version != version:
+        with open(scene_path, "rb") as f:
+            scene_dict = pickle.load(f)
+        worker_scene = PASOS(False)
+        worker_scene.edtv = {"time": 0}
+        worker_scene.duration = scene_dict["duration"]
+        worker_scene.timeline = scene_dict["timeline"]
+        worker_scene.invisible_objects = scene_dict["invisible_objects"]
+        worker_scene.tabulated_rate_functions = scene_dict["tabulated_rate_functions"]
+        worker_scene.use_point_arena = scene_dict["use_point_arena"]
+        worker_scene.construct()
+        worker_version = version
+    worker_scene.edtv["time"] = time
+    worker_scene.update_mobs()
+    worker_scene.renderer.update_frame(worker_scene)
+    return np.array(worker_scene.renderer.camera.pixel_array) # same layout the preview shows (height, width, RGBA)
+
+class PrerenderPool:
+    def __init__(self, workers: int, render_config: dict):
+        context = multiprocessing.get_context("spawn")
+        self.workers = workers
+        self.resolution = (render_config["pixel_width"], render_config["pixel_height"])
+        self.executor = ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker, initargs=(render_config,))
+        self.frames = {} # frame number -> Future, only frames at or ahead of the playhead are kept
+        self.version = None
+        self.directory = tempfile.mkdtemp(prefix="pasos-prerender-")
+        self.scene_path = None # scene of the current version, read by the workers
+
+    # the timeline is copied, so the editor can keep changing it while it's written for the workers
+    def set_scene(self, version: int, scene):
+        if version == self.version:
+            return
+        self.clear()
+        self.version = version
+        if self.scene_path != None:
+            try:
+                os.remove(self.scene_path) # requests of the old version were cancelled, the ones still running just fail
+            except OSError: # windows doesn't remove files that a worker has open, it's removed with the directory
+                pass
+        self.scene_path = os.path.join(self.directory, f"scene{version}.pickle")
+        scene_dict = copy_scene_dict(scene)
+        scene_dict["tabulated_rate_functions"] = scene.tabulated_rate_functions
+        scene_dict["use_point_arena"] = scene.use_point_arena
+        with open(self.scene_path, "wb") as f:
+            pickle.dump(scene_dict, f, pickle.HIGHEST_PROTOCOL)
+
+    def request(self, frame_number: int, time: float):
+        if frame_number not in self.frames:
+            self.frames[frame_number] = self.executor.submit(render_preview_frame, self.version, self.scene_path, time)
+
+    def ready_frame(self, frame_number: int):
+        future = self.frames.get(frame_number)
+        if future == None or not future.done() or future.cancelled() or future.exception() != None:
+            return None
+        return future.result()
+
+    def discard_before(self, frame_number: int):
+        for n in [n for n in self.frames if n < frame_number]:
+            self.frames.pop(n).cancel()
+
+    def n_of_ready_frames(self) -> int:
+        return sum(future.done() for future in self.frames.values())
+
+    def clear(self):
+        for future in self.frames.values():
+            future.cancel()
+        self.frames.clear()
+
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(self.directory, ignore_errors=True)
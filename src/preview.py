@@ -1,11 +1,63 @@
 from pathlib import Path
+from collections import OrderedDict
+import math
+import queue
 import pygame
 import numpy as np
 from PyQt6 import QtWidgets
+from .prerender import PrerenderPool
+from .profiling import PROFILER
 
 KRPATH = str(Path(__file__).resolve().parent.parent) + "/"
 SCENE = None # PASOS scene
-F_array = lambda: np.swapaxes(SCENE.renderer.get_frame()[:, :, :3], 0, 1)
+IDLE_POLL_INTERVAL = 0.05 # while paused, how long the loop sleeps waiting for commands before checking pygame events
+DRAFT_SETTLE_TIME = 300 # milliseconds without scrubbing after which the draft preview goes back to full resolution
+F_array = lambda: SCENE.renderer.camera.pixel_array # (height, width, 4) RGBA buffer the camera renders into, not a copy
+
+# frames that were already shown, keyed by (timeline version, frame number), so scrubbing back to them doesn't render again
+class FrameCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.nbytes = 0
+
+    def get(self, key):
+        if key not in self.frames:
+            return None
+        self.frames.move_to_end(key)
+        return self.frames[key]
+
+    def put(self, key, frame):
+        if frame.nbytes > self.max_bytes:
+            return
+        if key in self.frames: # replaced, so its size isn't counted twice
+            self.nbytes -= self.frames.pop(key).nbytes
+        self.frames[key] = frame
+        self.nbytes += frame.nbytes
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self.frames.popitem(last=False)[1].nbytes
+
+    # stores a copy of a frame that will be overwritten (like the camera's buffer). when the cache is full, the buffer of
+    # an evicted frame is reused for the copy, so nothing is allocated
+    def put_copy(self, key, frame):
+        if frame.nbytes > self.max_bytes:
+            return
+        buffer = None
+        if key in self.frames:
+            self.nbytes -= self.frames.pop(key).nbytes
+        while self.frames and self.nbytes + frame.nbytes > self.max_bytes:
+            evicted = self.frames.popitem(last=False)[1]
+            self.nbytes -= evicted.nbytes
+            if evicted.shape == frame.shape and evicted.dtype == frame.dtype:
+                buffer = evicted
+        if buffer is None:
+            buffer = np.empty_like(frame)
+        np.copyto(buffer, frame)
+        self.put(key, buffer)
+
+    def clear(self):
+        self.frames.clear()
+        self.nbytes = 0
 
 class PreviewState:
     def __init__(self):
@@ -13,9 +65,21 @@ class PreviewState:
         self.visible_window = True
         self.window_resolution = (853, 480) #manim_resolution = (128/9, 8)
         self.window = None
-        self.surf = pygame.surfarray.make_surface(F_array())
+        self.frame_surf = None # surface created over the pixels of frame_surf_source, so showing a frame copies nothing
+        self.frame_surf_source = None
+        self.scaled_surf = None # preallocated target of the scaling, it's also the frame currently on the window
         self.play_tick_start = 0 # pygame time when playing starts
         self.play_time_start = 0 # scene time when playing starts
+        self.frame_cache = FrameCache(SCENE.edtv["preview_cache_mb"] * 2**20)
+        self.shown_frame_key = None # key of the frame currently on the window, None forces a redraw
+        self.clock = pygame.time.Clock()
+        self.prerender_pool = None # look-ahead workers used while playing (see prerender.py)
+        self.dropped_frames = 0 # frames that weren't ready in time while playing
+        self.full_resolution = (SCENE.camera.pixel_width, SCENE.camera.pixel_height)
+        self.last_time = 0 # scene time of the previous loop, to know when the user is scrubbing
+        self.last_time_change_tick = 0
+        self.hud_font = None # looking up a system font is slow, so the fonts are created when the window opens
+        self.overlay_font = None
 
 def run_preview(scene):
     global SCENE
@@ -27,14 +91,17 @@ def run_preview(scene):
         pygame.init() 
         V.window = pygame.display.set_mode(V.window_resolution)
         pygame.display.set_caption("Preview")
+        V.hud_font = pygame.font.SysFont(None, 20) # pygame.quit() invalidates them, so they're created every time the window opens
+        V.overlay_font = pygame.font.SysFont("monospace", 14)
         try:
             pygame.display.set_icon(pygame.image.load(KRPATH+"icon_light.png"))
         except:
             pass
         editor_window.mbtn_play.setEnabled(True)
+        V.shown_frame_key = None
 
         while V.running and V.visible_window:
-            function_calls(V)
+            wait_for_commands(V)
             pygame_loop(V)
 
         pygame.quit()
@@ -43,18 +110,115 @@ def run_preview(scene):
             editor_window.playing_toggle()
 
         while V.running and not V.visible_window:
-            function_calls(V)
+            handle_command(V, SCENE.edtv["preview_commands"].get()) # blocks until the editor sends something
+
+    if V.prerender_pool:
+        V.prerender_pool.shutdown()
 
-def function_calls(V):
-    if SCENE.edtv["function_call"]: # shared functions
-        if SCENE.edtv["function_call"][-1] == "set_preview_visibility":
-            V.visible_window = SCENE.edtv["function_call"][-2]
-            SCENE.edtv["function_call"].pop(-1)
-            SCENE.edtv["function_call"].pop(-1)
+# while playing, the loop is paced to the preview fps. while paused, it sleeps on the command queue and only wakes up
+# for a command (the editor sends "redraw" when the time or the timeline changes) or to check pygame events
+def wait_for_commands(V):
+    commands = SCENE.edtv["preview_commands"]
+    if SCENE.edtv["playing"]:
+        V.clock.tick(SCENE.edtv["preview_fps"])
+    else:
+        try:
+            handle_command(V, commands.get(timeout=IDLE_POLL_INTERVAL))
+        except queue.Empty:
+            pass
+    while True:
+        try:
+            handle_command(V, commands.get_nowait())
+        except queue.Empty:
+            break
+
+def handle_command(V, command):
+    if command[0] == "set_preview_visibility":
+        V.visible_window = command[1]
+    elif command[0] == "quit":
+        V.running = False
+    elif command[0] == "start_playing":
+        V.play_tick_start = pygame.time.get_ticks()
+        V.play_time_start = SCENE.edtv["time"]
+        V.dropped_frames = 0
+    elif command[0] == "set_profiling":
+        PROFILER.reset()
+        PROFILER.enabled = command[1]
+        V.shown_frame_key = None
+    elif command[0] == "set_tabulated_rate_functions":
+        SCENE.set_tabulated_rate_functions(command[1]) # changes timeline_version, so cached frames are discarded
+    elif command[0] == "set_point_arena":
+        SCENE.set_point_arena(command[1])
+    # "redraw" only wakes the loop up, pygame_loop decides by itself if the frame has to be rendered again
 
-        elif SCENE.edtv["function_call"][-1] == "quit":
-            V.running = False
-            SCENE.edtv["function_call"].pop(-1)
+def get_prerender_pool(V):
+    workers = SCENE.edtv["prerender_workers"]
+    if V.prerender_pool and (V.prerender_pool.workers != workers or V.prerender_pool.resolution != get_camera_resolution()):
+        V.prerender_pool.shutdown()
+        V.prerender_pool = None
+    if V.prerender_pool == None and workers > 0:
+        render_config = {"pixel_width": SCENE.camera.pixel_width, "pixel_height": SCENE.camera.pixel_height, "frame_rate": SCENE.camera.frame_rate}
+        V.prerender_pool = PrerenderPool(workers, render_config)
+    return V.prerender_pool
+
+def get_camera_resolution():
+    return (SCENE.camera.pixel_width, SCENE.camera.pixel_height)
+
+# in draft mode the preview camera renders at (a fraction of) the window resolution while the user is playing or
+# scrubbing, and goes back to full resolution when that stops. this only changes the preview scene's camera, the
+# exported scenes are created from manim's config
+def update_draft_resolution(V):
+    if SCENE.edtv["time"] != V.last_time:
+        V.last_time = SCENE.edtv["time"]
+        V.last_time_change_tick = pygame.time.get_ticks()
+    interacting = SCENE.edtv["playing"] or pygame.time.get_ticks() - V.last_time_change_tick < DRAFT_SETTLE_TIME
+    if SCENE.edtv["draft_preview"] and interacting:
+        scale = SCENE.edtv["draft_scale_percent"] / 100
+        resolution = (max(1, int(V.window_resolution[0] * scale)), max(1, int(V.window_resolution[1] * scale)))
+    else:
+        resolution = V.full_resolution
+    if resolution != get_camera_resolution():
+        SCENE.camera.reset_pixel_shape(resolution[1], resolution[0])
+        V.shown_frame_key = None
+
+# asks the workers for the frames the playhead will reach during the next prerender_buffer preview frames
+# while playing, frames are requested on a grid of preview frames that starts where playing started, and the window shows
+# the last point of the grid before the playhead. the playhead follows the wall clock, so rounding it to the scene's frames
+# would ask for frames the workers weren't rendering every time the loop runs a bit early or late
+def get_play_grid_frame(V, j=0) -> int:
+    step = SCENE.edtv["playing_speed"] / SCENE.edtv["preview_fps"] # scene time between two preview frames
+    k = math.floor((SCENE.edtv["time"] - V.play_time_start) / step + 1e-9) + j
+    return round((V.play_time_start + k * step) * SCENE.camera.frame_rate)
+
+def prerender_ahead(V, pool):
+    pool.set_scene(SCENE.timeline_version, SCENE)
+    fps = SCENE.camera.frame_rate
+    pool.discard_before(get_play_grid_frame(V))
+    for j in range(SCENE.edtv["prerender_buffer"]):
+        frame_number = get_play_grid_frame(V, j)
+        if frame_number / fps > SCENE.duration:
+            break
+        pool.request(frame_number, frame_number / fps)
+
+def draw_hud(V, pool):
+    text = f"buffer {pool.n_of_ready_frames()}/{SCENE.edtv['prerender_buffer']}   dropped {V.dropped_frames}"
+    label = V.hud_font.render(text, True, (255, 255, 255), (0, 0, 0))
+    V.window.blit(label, (5, 5))
+
+# phases of the frames rendered by this thread (see profiling.py), smoothed over the last frames
+def draw_profiler_overlay(V):
+    for k, line in enumerate(PROFILER.overlay_lines()):
+        label = V.overlay_font.render(line, True, (255, 255, 255), (0, 0, 0))
+        V.window.blit(label, (V.window_resolution[0] - label.get_width() - 5, 5 + k * label.get_height()))
+
+def show_frame(V, frame):
+    if V.frame_surf_source is not frame:
+        V.frame_surf = pygame.image.frombuffer(frame, (frame.shape[1], frame.shape[0]), "RGBX")
+        V.frame_surf_source = frame
+    if V.scaled_surf == None or V.scaled_surf.get_bitsize() != V.frame_surf.get_bitsize():
+        V.scaled_surf = pygame.Surface(V.window_resolution, 0, V.frame_surf)
+    pygame.transform.scale(V.frame_surf, V.window_resolution, V.scaled_surf)
+    V.window.blit(V.scaled_surf, (0, 0))
 
 def pygame_loop(V):
     editor_window = SCENE.edtv["editor_window_object"]
@@ -63,24 +227,54 @@ def pygame_loop(V):
         if event.type == pygame.QUIT:
             V.visible_window = False
             editor_window.preview_menu_action.setChecked(False)
+        if event.type == pygame.VIDEOEXPOSE:
+            V.shown_frame_key = None
         #if event.type == pygame.MOUSEBUTTONDOWN:
         #    dragging = True
         #if event.type == pygame.MOUSEBUTTONUP:
         #    dragging = False
 
-    if SCENE.edtv["function_call"] and SCENE.edtv["function_call"][-1] == "start_playing":
-        V.play_tick_start = pygame.time.get_ticks()
-        V.play_time_start = SCENE.edtv["time"]
-        SCENE.edtv["function_call"].pop(-1)
-
     if SCENE.edtv["playing"]:
         editor_window.set_time_to(V.play_time_start + (pygame.time.get_ticks() - V.play_tick_start)/1000 * SCENE.edtv["playing_speed"])
         if SCENE.edtv["time"] > SCENE.duration:
             editor_window.set_time_to(SCENE.duration)
             editor_window.playing_toggle()
 
-    SCENE.update_mobs()
-    SCENE.renderer.update_frame(SCENE)
-    pygame.surfarray.blit_array(V.surf, F_array())
-    V.window.blit(pygame.transform.scale(V.surf, V.window_resolution), (0, 0))
+    update_draft_resolution(V)
+
+    # the time is quantized to the scene's frame rate (or to the grid of get_play_grid_frame while the workers render
+    # ahead), if that frame is already on the window nothing is rendered
+    pool = get_prerender_pool(V) if SCENE.edtv["playing"] and not PROFILER.enabled else None
+    frame_number = get_play_grid_frame(V) if pool else round(SCENE.edtv["time"] * SCENE.camera.frame_rate)
+    frame_key = (SCENE.timeline_version, frame_number, get_camera_resolution())
+    if frame_key == V.shown_frame_key:
+        return
+    V.frame_cache.max_bytes = SCENE.edtv["preview_cache_mb"] * 2**20
+    # while profiling every frame is rendered here, so the overlay measures them (instead of cache hits or the workers)
+    frame = None if PROFILER.enabled else V.frame_cache.get(frame_key)
+    if pool:
+        # while playing, the window only shows frames the workers already rendered
+        prerender_ahead(V, pool)
+        if frame is None:
+            frame = pool.ready_frame(frame_number)
+            if frame is None:
+                V.dropped_frames += 1
+                if V.scaled_surf:
+                    V.window.blit(V.scaled_surf, (0, 0))
+                draw_hud(V, pool)
+                pygame.display.flip()
+                return
+            V.frame_cache.put(frame_key, frame)
+    elif frame is None:
+        SCENE.update_mobs()
+        SCENE.renderer.update_frame(SCENE)
+        frame = F_array()
+        V.frame_cache.put_copy(frame_key, frame)
+    V.shown_frame_key = frame_key
+
+    show_frame(V, frame)
+    if pool:
+        draw_hud(V, pool)
+    if PROFILER.enabled:
+        draw_profiler_overlay(V)
     pygame.display.flip()
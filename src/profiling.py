@@ -0,0 +1,123 @@
+# switchable timers for the phases of a frame (see PASOS.update_mobs and rebuild_mob), with counters per mobject and
+# per track. when a profiler isn't enabled every hook is a single attribute check, so they're always compiled in.
+# scenes use PROFILER (the one the preview overlay shows) unless they get their own, like exports and headless renders,
+# which write a summary report
+from time import perf_counter
+from .timeline_model import get_track_property, get_track_mob_idx
+
+PHASES = [
+    "keyframes",     # finding the current event of every track and resolving its initial value
+    "formulas",      # evaluating L:/G:/E: formulas and the end values of sprite formulas
+    "interpolation", # interpolating the animations of C:/W:/T:/S: events
+    "become",        # replacing the points of a mobject with its new sprite
+    "transforms",    # shift/rotate/scale/fade of the rebuilt mobjects
+    "rasterization", # renderer.update_frame (cairo)
+    "encoding",      # writing the frame to the movie file (exports only)
+]
+SMOOTHING = 0.1 # weight of the last frame in the moving averages shown by the overlay
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.phases = {phase: [0.0, 0] for phase in PHASES} # phase -> [seconds, calls]
+        self.tracks = {} # row index -> [seconds, calls], time spent evaluating the formulas and animations of the row
+        self.mobs = {} # mob index -> [seconds, calls], time spent rebuilding the mob (become and transforms)
+        self.frame_phases = dict.fromkeys(PHASES, 0.0) # seconds of the current frame
+        self.averages = dict.fromkeys(PHASES, 0.0) # smoothed seconds per frame
+
+    # adds the time since start (a perf_counter() value) to a phase and, optionally, to a track.
+    # returns the current perf_counter(), so consecutive phases can be chained
+    def add(self, phase: str, start: float, track: int = None) -> float:
+        now = perf_counter()
+        elapsed = now - start
+        stats = self.phases[phase]
+        stats[0] += elapsed
+        stats[1] += 1
+        self.frame_phases[phase] += elapsed
+        if track != None:
+            add_to_counter(self.tracks, track, elapsed)
+        return now
+
+    def add_mob(self, mob_idx: int, start: float):
+        add_to_counter(self.mobs, mob_idx, perf_counter() - start)
+
+    def frame_done(self):
+        self.frames += 1
+        weight = 1 if self.frames == 1 else SMOOTHING
+        for phase, seconds in self.frame_phases.items():
+            self.averages[phase] += weight * (seconds - self.averages[phase])
+            self.frame_phases[phase] = 0.0
+
+    # json-friendly totals, summaries of several processes can be added with merge_summaries
+    def summary(self) -> dict:
+        return {
+            "frames": self.frames,
+            "phases": {phase: {"seconds": s, "calls": c} for phase, (s, c) in self.phases.items()},
+            "tracks": {str(k): {"seconds": s, "calls": c} for k, (s, c) in self.tracks.items()},
+            "mobs": {str(k): {"seconds": s, "calls": c} for k, (s, c) in self.mobs.items()},
+        }
+
+    # lines of the preview overlay
+    def overlay_lines(self) -> list:
+        lines = [f"{phase:<14}{1000 * self.averages[phase]:7.2f} ms" for phase in PHASES if self.phases[phase][1]]
+        lines.append(f"{'total':<14}{1000 * sum(self.averages.values()):7.2f} ms")
+        return lines
+
+# wraps a method of an object (like renderer.update_frame) so its time goes to a phase of get_profiler(), which is
+# called every time (scenes can change their profiler). ends_frame is for the method that is called last for every frame
+def instrument(obj, method_name: str, phase: str, get_profiler, ends_frame: bool = False):
+    method = getattr(obj, method_name)
+    def timed_method(*args, **kwargs):
+        profiler = get_profiler()
+        if not profiler.enabled:
+            return method(*args, **kwargs)
+        start = perf_counter()
+        result = method(*args, **kwargs)
+        profiler.add(phase, start)
+        if ends_frame:
+            profiler.frame_done()
+        return result
+    setattr(obj, method_name, timed_method)
+
+def add_to_counter(counters: dict, key, elapsed: float):
+    stats = counters.get(key)
+    if stats == None:
+        counters[key] = [elapsed, 1]
+    else:
+        stats[0] += elapsed
+        stats[1] += 1
+
+def merge_summaries(summaries: list) -> dict:
+    merged = {"frames": 0, "phases": {}, "tracks": {}, "mobs": {}}
+    for summary in summaries:
+        merged["frames"] += summary["frames"]
+        for group in ("phases", "tracks", "mobs"):
+            for key, stats in summary[group].items():
+                total = merged[group].setdefault(key, {"seconds": 0.0, "calls": 0})
+                total["seconds"] += stats["seconds"]
+                total["calls"] += stats["calls"]
+    return merged
+
+# plain text report of a summary, with the slowest tracks and mobjects
+def format_report(summary: dict, top: int = 10) -> str:
+    frames = max(summary["frames"], 1)
+    lines = [f"{summary['frames']} frames", "", f"{'phase':<16}{'ms/frame':>10}{'total s':>10}{'calls':>10}"]
+    for phase, stats in summary["phases"].items():
+        lines.append(f"{phase:<16}{1000 * stats['seconds'] / frames:>10.2f}{stats['seconds']:>10.2f}{stats['calls']:>10}")
+    total = sum(stats["seconds"] for stats in summary["phases"].values())
+    lines.append(f"{'total':<16}{1000 * total / frames:>10.2f}{total:>10.2f}")
+    for group, label in (("tracks", "track"), ("mobs", "mob")):
+        slowest = sorted(summary[group].items(), key=lambda item: -item[1]["seconds"])[:top]
+        if not slowest:
+            continue
+        lines += ["", f"slowest {group}", f"{label:<16}{'ms/frame':>10}{'total s':>10}{'calls':>10}"]
+        for key, stats in slowest:
+            name = f"mob{get_track_mob_idx(int(key)) + 1}.{get_track_property(int(key))}" if group == "tracks" else f"mob{int(key) + 1}"
+            lines.append(f"{name:<16}{1000 * stats['seconds'] / frames:>10.2f}{stats['seconds']:>10.2f}{stats['calls']:>10}")
+    return "\n".join(lines)
+
+PROFILER = Profiler()
@@ -0,0 +1,50 @@
+import numpy as np
+
+manim_rate_functions = [
+    "linear", "smooth", "smoothstep", "rush_into",
+    "rush_from", "slow_into", "double_smooth", "there_and_back",
+    "there_and_back_with_pause", "running_start", "wiggle", "lingering",
+    "exponential_decay", "ease_in_sine", "ease_out_sine", "ease_in_out_sine",
+    "ease_in_quad", "ease_out_quad", "ease_in_out_quad", "ease_in_cubic",
+    "ease_out_cubic", "ease_in_out_cubic", "ease_in_quart", "ease_out_quart",
+    "ease_in_out_quart", "ease_in_quint", "ease_out_quint", "ease_in_out_quint",
+    "ease_in_expo", "ease_out_expo", "ease_in_out_expo", "ease_in_circ",
+    "ease_out_circ", "ease_in_out_circ", "ease_in_back", "ease_out_back",
+    "ease_in_out_back", "ease_in_elastic", "ease_out_elastic", "ease_in_out_elastic",
+    "ease_in_bounce", "ease_out_bounce", "ease_in_out_bounce", "ease_in_out_bounce"
+]
+
+TABLE_RESOLUTION = 1024
+
+# a rate function sampled at TABLE_RESOLUTION + 1 evenly spaced points and linearly interpolated between them.
+# it accepts numpy arrays, so it can be used for batch evaluation.
+# error bound: on every interval where the easing is twice differentiable, |error| <= h^2/8 * max|f''|, with
+# h = 1/TABLE_RESOLUTION. for the default resolution that is about 1.2e-7 * max|f''|, e.g. 1.4e-6 for ease_in_out_cubic
+# (max|f''| = 12). easings with kinks (there_and_back, the bounces) are only bounded by h/2 * max|f'| on the interval
+# that contains the kink
+class TabulatedRateFunction:
+    def __init__(self, function, resolution=TABLE_RESOLUTION):
+        self.function = function
+        self.xs = np.linspace(0, 1, resolution + 1)
+        self.ys = np.array([function(x) for x in self.xs], dtype=float)
+
+    def __call__(self, t):
+        return np.interp(t, self.xs, self.ys)
+
+resolved_rate_functions = {} # (name, tabulated) -> callable
+
+# easing names are resolved once, so update_mobs doesn't need eval() on every frame
+def get_rate_function(name: str, tabulated: bool = False):
+    if (name, tabulated) not in resolved_rate_functions:
+        if name not in manim_rate_functions:
+            raise ValueError(f"Rate function '{name}' not recognized")
+        from manim.utils import rate_functions
+        function = getattr(rate_functions, name)
+        resolved_rate_functions[(name, tabulated)] = TabulatedRateFunction(function) if tabulated else function
+    return resolved_rate_functions[(name, tabulated)]
+
+def check_timeline_rate_functions(timeline: list):
+    for row_idx, event_list in enumerate(timeline):
+        for event_idx, p_event in enumerate(event_list):
+            if p_event.easing not in manim_rate_functions:
+                raise ValueError(f"Rate function '{p_event.easing}' not recognized (row {row_idx}, event {event_idx})")
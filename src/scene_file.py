@@ -0,0 +1,209 @@
+# reading and writing scene files. scenes can be saved as json (.json) or in a compact binary format (.pasosb)
+# that stores the events in columns and is memory-mapped when opened, so rows are only turned into python lists
+# when something accesses them (the timeline canvas only paints the visible rows, for example).
+#
+# binary layout (little endian):
+#   MAGIC | header length (uint64) | json header | padding to 8 bytes | columns
+# the header has the duration, the invisible objects, the interned strings (easings and formulas) and the offset of
+# every column. the columns hold the events of all rows back to back:
+#   row_offsets (int64, n_of_rows + 1)  the events of row i are [row_offsets[i], row_offsets[i+1])
+#   starts, durations (float64)
+#   easings, formulas (uint32)           indexes into the string table
+#   int_flags (uint8)                    bit 0/1: start/duration were ints, so json files round-trip exactly
+#   ids (int64)                          PEvent.id, files written before events had ids don't have this column
+import json
+import struct
+import threading
+from collections.abc import MutableSequence
+
+import numpy as np
+
+from .rate_functions import manim_rate_functions, check_timeline_rate_functions
+from .timeline_model import PEvent, timeline_from_lists, timeline_to_lists, copy_timeline
+
+MAGIC = b"PASOSB1\n"
+BINARY_SUFFIX = ".pasosb"
+COLUMNS = [("row_offsets", "<i8"), ("starts", "<f8"), ("durations", "<f8"), ("easings", "<u4"), ("formulas", "<u4"), ("int_flags", "u1"), ("ids", "<i8")]
+MAX_EXACT_INT = 2**53 # bigger ints can't be stored in a float64 without losing precision
+
+def is_binary_path(path) -> bool:
+    return str(path).lower().endswith(BINARY_SUFFIX)
+
+# a timeline that materializes its rows from the memory-mapped columns the first time they are accessed.
+# it can be used everywhere a list of rows is used; list(timeline) loads every row
+class LazyTimeline(MutableSequence):
+    def __init__(self, columns: dict, strings: list):
+        self.columns = columns
+        self.strings = strings
+        self.rows = [None] * (len(columns["row_offsets"]) - 1) # None means not loaded yet
+        self.lock = threading.Lock() # the preview thread and the qt thread must get the same list for a row
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self.rows)))]
+        idx = self.normalize_index(idx)
+        row = self.rows[idx]
+        if row == None:
+            with self.lock:
+                row = self.rows[idx]
+                if row == None:
+                    row = self.rows[idx] = self.load_row(idx)
+        return row
+
+    # a slice can change the number of rows, so every row is loaded before it's assigned
+    def __setitem__(self, idx, row):
+        if isinstance(idx, slice):
+            self.load_all()
+            self.rows[idx] = row
+        else:
+            self.rows[self.normalize_index(idx)] = row
+
+    # the columns are indexed by the original row positions, so rows are loaded before they move
+    def __delitem__(self, idx):
+        if not isinstance(idx, slice):
+            idx = self.normalize_index(idx)
+        self.load_all()
+        del self.rows[idx]
+
+    # negative indexes must be turned into row positions before load_row reads row_offsets[idx + 1].
+    # raises IndexError like a list if it's out of range
+    def normalize_index(self, idx: int) -> int:
+        return range(len(self.rows))[idx]
+
+    def insert(self, idx, row):
+        if idx < len(self.rows):
+            self.load_all()
+        self.rows.insert(idx, row)
+
+    def load_row(self, idx: int) -> list:
+        c = self.columns
+        first, last = int(c["row_offsets"][idx]), int(c["row_offsets"][idx + 1])
+        starts, durations = c["starts"][first:last].tolist(), c["durations"][first:last].tolist()
+        easings, formulas, flags = c["easings"][first:last].tolist(), c["formulas"][first:last].tolist(), c["int_flags"][first:last].tolist()
+        ids = c["ids"][first:last].tolist() if "ids" in c else [None] * (last - first)
+        return [
+            PEvent(int(s) if f & 1 else s, int(d) if f & 2 else d, self.strings[e], self.strings[fo], i)
+            for s, d, e, fo, f, i in zip(starts, durations, easings, formulas, flags, ids)
+            ]
+
+    # loads every row and closes the file mapping (needed before the file is overwritten)
+    def load_all(self):
+        with self.lock:
+            if self.columns == None:
+                return
+            for i, row in enumerate(self.rows):
+                if row == None:
+                    self.rows[i] = self.load_row(i)
+            self.columns = None
+
+    def n_of_loaded_rows(self) -> int:
+        return sum(row != None for row in self.rows)
+
+# rows that are python lists already (all of them for a json timeline)
+def loaded_rows(timeline) -> list:
+    if isinstance(timeline, LazyTimeline):
+        return [row for row in timeline.rows if row != None]
+    return timeline
+
+def get_number_flag(value, bit: int) -> int:
+    if isinstance(value, int):
+        if abs(value) >= MAX_EXACT_INT:
+            raise ValueError(f"{value} is too big for the binary scene format")
+        return bit
+    return 0
+
+def get_data_start(header_length: int) -> int:
+    header_end = len(MAGIC) + 8 + header_length
+    return header_end + (-header_end % 8)
+
+def write_binary_scene(path, scene_dict: dict):
+    timeline = scene_dict["timeline"]
+    strings = {} # string -> index, easings and formulas are usually repeated a lot
+    intern = lambda s: strings.setdefault(s, len(strings))
+    n_of_events = sum(len(row) for row in timeline)
+    columns = {name: np.empty(n_of_events if name != "row_offsets" else len(timeline) + 1, dtype) for name, dtype in COLUMNS}
+    columns["row_offsets"][0] = 0
+    k = 0
+    for row_idx, row in enumerate(timeline):
+        for p_event in row:
+            if not isinstance(p_event.easing, str) or not isinstance(p_event.formula, str):
+                raise ValueError(f"Easings and formulas must be strings (row {row_idx})")
+            columns["starts"][k] = p_event.start
+            columns["durations"][k] = p_event.duration
+            columns["easings"][k] = intern(p_event.easing)
+            columns["formulas"][k] = intern(p_event.formula)
+            columns["int_flags"][k] = get_number_flag(p_event.start, 1) | get_number_flag(p_event.duration, 2)
+            columns["ids"][k] = p_event.id
+            k += 1
+        columns["row_offsets"][row_idx + 1] = k
+
+    header = {"duration": scene_dict["duration"], "invisible_objects": scene_dict["invisible_objects"], "strings": list(strings), "columns": {}}
+    offset = 0 # relative to the start of the columns
+    for name, _ in COLUMNS:
+        header["columns"][name] = [offset, len(columns[name])]
+        offset += columns[name].nbytes + (-columns[name].nbytes % 8)
+    header_bytes = json.dumps(header).encode()
+    data_start = get_data_start(len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, _ in COLUMNS:
+            data = columns[name].tobytes()
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+
+def read_binary_scene(path, lazy: bool = True) -> dict:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a PASOS binary scene")
+        header_length, = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length))
+
+    data = np.memmap(path, dtype=np.uint8, mode="r") # the columns are views of this mapping, nothing is read yet
+    data_start = get_data_start(header_length)
+    columns = {}
+    for name, dtype in COLUMNS:
+        if name not in header["columns"]: # a column added after the file was written
+            continue
+        offset, length = header["columns"][name]
+        columns[name] = np.frombuffer(data, dtype, count=length, offset=data_start + offset)
+    # easings are checked from the string table, so the rows don't have to be loaded for it
+    for i in np.unique(columns["easings"]).tolist():
+        if header["strings"][i] not in manim_rate_functions:
+            raise ValueError(f"Rate function '{header['strings'][i]}' not recognized")
+
+    timeline = LazyTimeline(columns, header["strings"])
+    if not lazy:
+        timeline.load_all()
+        timeline = timeline.rows
+    return {"duration": header["duration"], "timeline": timeline, "invisible_objects": header["invisible_objects"]}
+
+def read_scene_file(path, lazy: bool = True) -> dict:
+    if is_binary_path(path):
+        return read_binary_scene(path, lazy)
+    with open(path, "r") as f:
+        scene_dict = json.load(f)
+    scene_dict["timeline"] = timeline_from_lists(scene_dict["timeline"])
+    check_timeline_rate_functions(scene_dict["timeline"])
+    return scene_dict
+
+def write_scene_file(path, scene_dict: dict):
+    if isinstance(scene_dict["timeline"], LazyTimeline):
+        scene_dict["timeline"].load_all() # the file may be the one that is mapped
+    if is_binary_path(path):
+        write_binary_scene(path, scene_dict)
+    else:
+        with open(path, "w") as f:
+            json.dump(dict(scene_dict, timeline=timeline_to_lists(scene_dict["timeline"])), f, indent=4)
+
+# a copy of the scene that can be written or rendered in another thread while the editor keeps changing it
+def copy_scene_dict(scene) -> dict:
+    if isinstance(scene.timeline, LazyTimeline):
+        scene.timeline.load_all() # so the mapped file can be overwritten
+    return {"duration": scene.duration, "timeline": copy_timeline(scene.timeline), "invisible_objects": list(scene.invisible_objects)}
@@ -1,6 +1,8 @@
+from bisect import bisect_left
 from PyQt6.QtWidgets import QWidget
-from PyQt6.QtGui import QPainter, QFontMetrics, QPalette, QColor
+from PyQt6.QtGui import QPainter, QFontMetrics, QPalette, QColor, QPixmap
 from PyQt6.QtCore import Qt, pyqtSignal, QRect
+from .timeline_model import PEvent, get_track_property, get_track_mob_idx
 
 def qcolor_interpolation(color1: QColor, color2: QColor, alpha: float) -> QColor:
     if alpha < 0 or alpha > 1:
@@ -16,6 +18,37 @@ def qcolor_interpolation(color1: QColor, color2: QColor, alpha: float) -> QColor
 
     return QColor(new_r, new_g, new_b, new_a)
 
+# rows are kept sorted by start and without overlaps, so their start times (and end times) are sorted and can be bisected.
+# this is a sequence view of the start times, so bisect doesn't need a copy of the row
+class StartTimes:
+    def __init__(self, row: list):
+        self.row = row
+
+    def __len__(self):
+        return len(self.row)
+
+    def __getitem__(self, idx):
+        return self.row[idx].start
+
+# returns (index, event) of the event under the time, or (0, None)
+def find_event_at(row: list, time: float):
+    idx = bisect_left(StartTimes(row), time) - 1 # last event that starts before the time
+    if idx >= 0 and time < row[idx].end:
+        return idx, row[idx]
+    return 0, None
+
+def find_event_index(row: list, p_event: PEvent) -> int:
+    idx = bisect_left(StartTimes(row), p_event.start)
+    while row[idx] is not p_event:
+        idx += 1
+    return idx
+
+# the interval an event can occupy without overlapping its neighbors
+def get_free_interval(row: list, idx: int, duration: float) -> tuple:
+    left = row[idx - 1].end if idx > 0 else 0
+    right = row[idx + 1].start if idx < len(row) - 1 else duration
+    return left, right
+
 class TimeLineCanvas(QWidget):
     edit_event = pyqtSignal(object, int, int)
     timeline_changed = pyqtSignal()
@@ -30,10 +63,14 @@ class TimeLineCanvas(QWidget):
     resizing_side = None
     resizing_flag = False
     resizing_end = 0
-    selected_events = set()
-    selected_events_mapping = {}
+    selected_events = set() # PEvent.id of the selected events
+    selected_row_idx = 0
     moving_flag = False
     moving_offset = 0
+    static_layer = None # pixmap with everything but the cursor, covering static_layer_rect
+    static_layer_rect = QRect()
+    static_layer_key = None
+    cursor_x = None
 
     def __init__(self, scene, scroll_area):
         super().__init__()
@@ -60,16 +97,54 @@ class TimeLineCanvas(QWidget):
         row_accumulated_height = self.n_of_rows * self.row_height
         self.setMinimumSize(max(self.duration_width, self.scroll_area.width()), max(row_accumulated_height, self.scroll_area.height()))
 
+    # the part of the canvas the scroll area is showing
+    def visible_rect(self) -> QRect:
+        viewport = self.scroll_area.viewport()
+        return QRect(-self.x(), -self.y(), viewport.width(), viewport.height()).intersected(self.rect())
+
     def paintEvent(self, event):
         self.update_size()
 
+        # the grid, labels and events are painted into a pixmap that's reused until something in them changes or the user
+        # scrolls out of it, so moving the cursor only copies the pixmap back under the cursor's old and new strips
+        static_layer_key = (self.scene.timeline_version, frozenset(self.selected_events), self.sec_width, self.scene.duration, self.width(), self.height())
+        if static_layer_key != self.static_layer_key or not self.static_layer_rect.contains(event.rect()):
+            visible = self.visible_rect()
+            margin_x, margin_y = visible.width() // 2, visible.height() // 2
+            self.static_layer_rect = visible.adjusted(-margin_x, -margin_y, margin_x, margin_y).united(event.rect()).intersected(self.rect())
+            self.static_layer_key = static_layer_key
+            self.paint_static_layer()
+
         painter = QPainter(self)
+        painter.setClipRect(event.rect())
+        painter.drawPixmap(self.static_layer_rect.topLeft(), self.static_layer)
+
+        # draw cursor
+        painter.setPen(self.cursor_color)
+        self.cursor_x = 100 + int(self.scene.edtv["time"] * self.sec_width)
+        painter.drawLine(self.cursor_x, 0, self.cursor_x, self.height())
+
+        painter.end()
+
+    def paint_static_layer(self):
+        area = self.static_layer_rect
+        ratio = self.devicePixelRatioF()
+        self.static_layer = QPixmap(max(1, int(area.width() * ratio)), max(1, int(area.height() * ratio)))
+        self.static_layer.setDevicePixelRatio(ratio)
+
+        painter = QPainter(self.static_layer)
+        painter.translate(-area.x(), -area.y())
         font = self.font()
         painter.setFont(font)
-        
+        font_metrics = QFontMetrics(font)
+        first_row = max(area.top() // self.row_height, 0)
+        last_row = min(area.bottom() // self.row_height, self.n_of_rows - 1)
+        min_time = (area.left() - 100) / self.sec_width # time range of the events that may be visible
+        max_time = (area.right() - 100) / self.sec_width
+
         # draw background
         painter.setBrush(self.bg_color)
-        painter.fillRect(0, 0, self.width(), self.height(), painter.brush())
+        painter.fillRect(area, painter.brush())
 
         # draw rows
         painter.setPen(self.grid_color)
@@ -77,65 +152,77 @@ class TimeLineCanvas(QWidget):
         painter.fillRect(100, 0, self.width(), self.n_of_rows * self.row_height, painter.brush())
         painter.setBrush(self.row_fill)
         painter.fillRect(100, 0, self.duration_width - 100, self.n_of_rows * self.row_height, painter.brush())
-        for row in range(1, self.n_of_rows + 1): # draw grid
+        for row in range(first_row + 1, last_row + 2): # draw grid
             painter.drawLine(100, row * self.row_height, self.width(), row * self.row_height)
-        
+
         # draw row labels
-        painter.setPen(self.row_label_border)
-        painter.setBrush(self.row_label_fill)
-        painter.fillRect(0, 0, 100, self.n_of_rows * self.row_height, painter.brush())
-        for row in range(self.n_of_rows):
-            rect_text = "mob" + str(row//5 + 1) + "." + ["position", "angle", "scale", "opacity", "sprite"][row%5]
-            painter.drawRect(0, row * self.row_height, 100, self.row_height)
-            painter.drawText(
-                QRect(5, row * self.row_height, 90, self.row_height),
-                Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
-                QFontMetrics(font).elidedText(rect_text, Qt.TextElideMode.ElideRight, 90)
-                )
-        
+        if area.left() < 100:
+            painter.setPen(self.row_label_border)
+            painter.setBrush(self.row_label_fill)
+            painter.fillRect(0, 0, 100, self.n_of_rows * self.row_height, painter.brush())
+            for row in range(first_row, last_row + 1):
+                rect_text = "mob" + str(get_track_mob_idx(row) + 1) + "." + get_track_property(row)
+                painter.drawRect(0, row * self.row_height, 100, self.row_height)
+                painter.drawText(
+                    QRect(5, row * self.row_height, 90, self.row_height),
+                    Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                    font_metrics.elidedText(rect_text, Qt.TextElideMode.ElideRight, 90)
+                    )
+
         # draw events
-        for row_idx, row in enumerate(self.scene.timeline):
-            for p_event in row: #p_event stands for "pasos event"
-                if id(p_event) in self.selected_events:
+        for row_idx in range(first_row, min(last_row + 1, len(self.scene.timeline))):
+            row = self.scene.timeline[row_idx]
+            for idx in range(max(bisect_left(StartTimes(row), min_time) - 1, 0), len(row)):
+                p_event = row[idx] #p_event stands for "pasos event"
+                if p_event.start > max_time:
+                    break
+                if p_event.id in self.selected_events:
                     painter.setPen(self.selected_event_border)
                     painter.setBrush(self.selected_event_fill)
                 else:
                     painter.setPen(self.event_border)
                     painter.setBrush(self.event_fill)
-                rect = QRect(100 + int(p_event[0] * self.sec_width), row_idx * self.row_height, int(p_event[1] * self.sec_width), self.row_height)
+                rect = QRect(100 + int(p_event.start * self.sec_width), row_idx * self.row_height, int(p_event.duration * self.sec_width), self.row_height)
                 painter.fillRect(rect, painter.brush())
                 painter.drawRect(rect)
                 painter.drawText(
                     QRect(rect.x() + 5, row_idx * self.row_height, rect.width() - 10, self.row_height),
                     Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
-                    QFontMetrics(font).elidedText(p_event[3], Qt.TextElideMode.ElideRight, 90)
+                    font_metrics.elidedText(p_event.formula, Qt.TextElideMode.ElideRight, 90)
                     )
-        
-        # draw cursor
-        painter.setPen(self.cursor_color)
-        time_x = 100 + int(self.scene.edtv["time"] * self.sec_width)
-        painter.drawLine(time_x, 0, time_x, self.height())
-        
+
         painter.end()
 
+    # repaints only the strips under the old and the new cursor position
+    def update_cursor(self):
+        new_x = 100 + int(self.scene.edtv["time"] * self.sec_width)
+        if new_x == self.cursor_x:
+            return
+        if self.cursor_x != None:
+            self.update(QRect(self.cursor_x - 1, 0, 3, self.height()))
+        self.update(QRect(new_x - 1, 0, 3, self.height()))
+
     def mouseMoveEvent(self, event):
         mouse_time = (event.position().x() - 100) / self.sec_width
         
         if self.resizing_flag:
             if self.resizing_side == "left":
                 new_start = min(max(mouse_time, self.left_barrier),  self.right_barrier)
-                self.hovered_event[0] = new_start
-                self.hovered_event[1] = self.resizing_end - new_start
+                self.hovered_event.start = new_start
+                self.hovered_event.duration = self.resizing_end - new_start
             elif self.resizing_side == "right":
-                self.hovered_event[1] = min(max(mouse_time, self.left_barrier),  self.right_barrier) - self.hovered_event[0]
+                self.hovered_event.duration = min(max(mouse_time, self.left_barrier),  self.right_barrier) - self.hovered_event.start
+            self.scene.invalidate_track(self.hovered_row_idx)
             self.timeline_changed.emit()
             self.update()
             return
 
         if self.moving_flag:
-            for p_event_id in self.selected_events:
-                p_event = self.selected_events_mapping[p_event_id]
-                p_event[0] = mouse_time + self.moving_offset
+            row = self.scene.timeline[self.selected_row_idx]
+            for p_event in [p_event for p_event in row if p_event.id in self.selected_events]:
+                left, right = get_free_interval(row, find_event_index(row, p_event), self.scene.duration)
+                p_event.start = min(max(mouse_time + self.moving_offset, left), right - p_event.duration) # events can't overlap
+                self.scene.invalidate_track(self.selected_row_idx)
                 self.timeline_changed.emit()
                 self.update()
 
@@ -148,31 +235,27 @@ class TimeLineCanvas(QWidget):
             if 0 <= new_row_idx < len(self.scene.timeline):
                 self.hovered_row = self.scene.timeline[new_row_idx]
         
-        if mouse_time < self.scene.duration and self.hovered_row and not (self.hovered_event and self.hovered_event[0] < mouse_time < self.hovered_event[0] + self.hovered_event[1]):
-            self.hovered_event_idx, self.hovered_event = next(((i,e) for i, e in enumerate(self.hovered_row) if e[0] < mouse_time < e[0] + e[1]), (0, None))
+        if mouse_time < self.scene.duration and self.hovered_row and not (self.hovered_event and self.hovered_event.start < mouse_time < self.hovered_event.end):
+            self.hovered_event_idx, self.hovered_event = find_event_at(self.hovered_row, mouse_time)
 
         self.setCursor(Qt.CursorShape.ArrowCursor)
         self.resizing_side = None
         if not self.hovered_event:
             return
 
-        e_start = self.hovered_event[0]
-        e_end = e_start + self.hovered_event[1]
+        e_start = self.hovered_event.start
+        e_end = self.hovered_event.end
         if mouse_time < e_start + 10/self.sec_width:
             self.setCursor(Qt.CursorShape.SizeHorCursor)
             self.resizing_side = "left"
-            if self.hovered_event_idx > 0:
-                previous_event = self.hovered_row[self.hovered_event_idx - 1]
-                self.left_barrier = previous_event[0] + previous_event[1]
-            else:
-                self.left_barrier = 0
+            self.left_barrier = get_free_interval(self.hovered_row, self.hovered_event_idx, self.scene.duration)[0]
             self.right_barrier = e_end
             self.resizing_end = e_end
         if mouse_time > e_end - 10/self.sec_width:
             self.setCursor(Qt.CursorShape.SizeHorCursor)
             self.resizing_side = "right"
             self.left_barrier = e_start
-            self.right_barrier = self.hovered_row[self.hovered_event_idx + 1][0] if self.hovered_event_idx < len(self.hovered_row) - 1 else self.scene.duration
+            self.right_barrier = get_free_interval(self.hovered_row, self.hovered_event_idx, self.scene.duration)[1]
 
     def mousePressEvent(self, event):
         if self.resizing_side:
@@ -180,13 +263,12 @@ class TimeLineCanvas(QWidget):
             return
 
         self.selected_events.clear()
-        self.selected_events_mapping.clear()
         if self.hovered_event:
-            self.selected_events.add(id(self.hovered_event))
-            self.selected_events_mapping[id(self.hovered_event)] = self.hovered_event
-            self.edit_event.emit(self.hovered_event, self.hovered_event_idx, self.hovered_row)
+            self.selected_events.add(self.hovered_event.id)
+            self.selected_row_idx = self.hovered_row_idx
+            self.edit_event.emit(self.hovered_event, self.hovered_event_idx, self.hovered_row_idx)
             self.moving_flag = True
-            self.moving_offset = self.hovered_event[0] - (event.position().x() - 100) / self.sec_width
+            self.moving_offset = self.hovered_event.start - (event.position().x() - 100) / self.sec_width
             self.update()
             return
         
@@ -0,0 +1,54 @@
+# the events of a timeline. scene.timeline is a list of rows (one per property of every mobject, see TRACK_PROPERTIES)
+# and every row is a list of PEvents sorted by start. scene files keep [start, duration, easing, formula, id] lists (files
+# written before events had ids don't have the id), they are converted when a file is read or written
+import threading
+
+TRACK_PROPERTIES = ["position", "angle", "scale", "opacity", "sprite"]
+
+def get_track_property(row_idx: int) -> str:
+    return TRACK_PROPERTIES[row_idx % 5]
+
+def get_track_mob_idx(row_idx: int) -> int:
+    return row_idx // 5
+
+# PEvent stands for "pasos event". every event has an id that stays the same in copies, in the journal and in the scene
+# file, so the editor can refer to an event (e.g. in its selection) without depending on its position in the row or on
+# the python object, which isn't the same after the scene is copied, recovered or opened again
+class PEvent:
+    __slots__ = ("start", "duration", "easing", "formula", "id")
+    next_id = 0 # new events get ids after every id that was loaded
+    ids_lock = threading.Lock() # rows of a binary file can be loaded by the preview thread
+
+    def __init__(self, start: float, duration: float, easing: str, formula: str, event_id: int = None):
+        self.start = start
+        self.duration = duration
+        self.easing = easing
+        self.formula = formula
+        with PEvent.ids_lock:
+            if event_id == None:
+                event_id = PEvent.next_id
+            PEvent.next_id = max(PEvent.next_id, event_id + 1)
+        self.id = event_id
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+    def copy(self):
+        return PEvent(self.start, self.duration, self.easing, self.formula, self.id)
+
+    def to_list(self) -> list:
+        return [self.start, self.duration, self.easing, self.formula, self.id]
+
+    def __repr__(self):
+        return f"PEvent({self.start}, {self.duration}, {self.easing!r}, {self.formula!r})"
+
+def timeline_from_lists(timeline: list) -> list:
+    return [[PEvent(*p_event) for p_event in row] for row in timeline]
+
+def timeline_to_lists(timeline) -> list:
+    return [[p_event.to_list() for p_event in row] for row in timeline]
+
+# a snapshot that can be sent to other processes while the editor keeps changing the original
+def copy_timeline(timeline) -> list:
+    return [[p_event.copy() for p_event in row] for row in timeline]